@@ -1,13 +1,26 @@
+import asyncio
+import json
 from datetime import timedelta
 from html import escape
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 from fastapi.responses import HTMLResponse
-from sqlalchemy import and_, select
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.db import get_db
+from app.db import SessionLocal, dialect_insert, engine, get_db, get_read_db, read_engine
 from app.models import MagicLinkToken, Message, Thread, User
 from app.schemas import (
     GoogleVerifyRequest,
@@ -17,6 +30,8 @@ from app.schemas import (
     MessageCreate,
     MessageRead,
     SessionRead,
+    ThreadActivity,
+    ThreadActivityRequest,
     UserUpdate,
     UserRead,
 )
@@ -30,16 +45,130 @@ from app.services.auth import (
     now_utc,
     token_hash,
 )
-from app.services.google_auth import verify_google_access_token
-from app.services.mailer import send_magic_link_email
+from app.services.backplane import create_backplane
+from app.services.cache import LRUCache
+from app.services.google_auth import GoogleTokenVerifier
+from app.services.mailer import MagicLinkMailer
+from app.services.message_cache import CachedMessage, RecentMessageCache, encode_message, render_messages
+from app.services.metrics import db_query_seconds, metrics, rate_limit_rejections
 from app.services.normalization import normalize_thread_key
-from app.services.rate_limiter import InMemoryRateLimiter
-from app.services.ws_hub import WebSocketHub
+from app.services.pagination import CURSOR_AFTER, CURSOR_BEFORE, decode_cursor, encode_cursor
+from app.services.rate_limiter import create_rate_limiter
+from app.services.retention import MessageArchiver
+from app.services.token_sweeper import MagicLinkTokenSweeper
+from app.services.write_batcher import MessageWriteBatcher
+from app.services.ws_hub import (
+    CONNECTION_LIMIT_CLOSE_CODE,
+    IDLE_CLOSE_CODE,
+    WebSocketHub,
+    compact_message,
+    encode_frame,
+)
 
 router = APIRouter(prefix="/api", tags=["chat"])
 ws_router = APIRouter(tags=["ws"])
-ws_hub = WebSocketHub()
-post_limiter = InMemoryRateLimiter(max_events=15, window_seconds=60)
+google_verifier = GoogleTokenVerifier(
+    cache_size=settings.google_verify_cache_size,
+    cache_ttl_seconds=settings.google_verify_cache_ttl_seconds,
+)
+magic_link_mailer = MagicLinkMailer(max_queue=settings.smtp_queue_size, max_attempts=settings.smtp_max_attempts)
+post_limiter = create_rate_limiter(
+    max_events=settings.post_rate_limit_max_events,
+    window_seconds=settings.post_rate_limit_window_seconds,
+)
+user_cache: LRUCache[int, tuple[UserRead, int]] = LRUCache(
+    maxsize=settings.user_cache_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
+thread_ids: LRUCache[str, int] = LRUCache(maxsize=settings.thread_id_cache_size)
+message_cache = RecentMessageCache(
+    max_threads=settings.message_cache_max_threads,
+    tail_size=settings.message_cache_tail_size,
+    ttl_seconds=settings.message_cache_ttl_seconds,
+    max_bytes=settings.message_cache_max_bytes,
+)
+
+
+def _cache_delivered_message(thread_key: str, message_id: int, body: str) -> None:
+    message_cache.append(thread_key, (message_id, body.encode("utf-8")))
+
+
+ws_hub = WebSocketHub(
+    max_queue=settings.ws_send_queue_size,
+    backplane=create_backplane(engine),
+    heartbeat_seconds=settings.ws_heartbeat_seconds,
+    max_connections=settings.ws_max_connections,
+    max_connections_per_ip=settings.ws_max_connections_per_ip,
+    max_batch=settings.ws_compact_max_batch,
+    on_message=_cache_delivered_message,
+)
+message_batcher = (
+    MessageWriteBatcher(
+        SessionLocal,
+        max_batch=settings.message_batch_max_size,
+        linger_ms=settings.message_batch_linger_ms,
+    )
+    if settings.message_batch_enabled
+    else None
+)
+message_archiver = MessageArchiver(
+    SessionLocal,
+    message_cache,
+    default_retention_days=settings.message_retention_days,
+    interval_seconds=settings.message_archive_interval_seconds,
+    batch_size=settings.message_archive_batch_size,
+)
+magic_link_sweeper = MagicLinkTokenSweeper(
+    SessionLocal,
+    interval_seconds=settings.magic_link_sweep_interval_seconds,
+    batch_size=settings.magic_link_sweep_batch_size,
+)
+
+metrics.callback(
+    "urlchatroom_ws_threads",
+    "Threads with at least one local WebSocket subscriber.",
+    "gauge",
+    lambda: [((), ws_hub.thread_count)],
+)
+metrics.callback(
+    "urlchatroom_ws_sockets",
+    "Open WebSocket connections on this worker.",
+    "gauge",
+    lambda: [((), ws_hub.connection_count)],
+)
+metrics.callback(
+    "urlchatroom_ws_queued_bytes",
+    "Bytes waiting in WebSocket send queues.",
+    "gauge",
+    lambda: [((), ws_hub.queued_bytes())],
+)
+metrics.callback(
+    "urlchatroom_message_cache_requests_total",
+    "Recent-message cache lookups.",
+    "counter",
+    lambda: [(("hit",), message_cache.hits), (("miss",), message_cache.misses)],
+    ("result",),
+)
+metrics.callback(
+    "urlchatroom_message_cache_bytes",
+    "Bytes of message bodies and thread keys held by the recent-message cache.",
+    "gauge",
+    lambda: [((), message_cache.size_bytes)],
+)
+metrics.callback(
+    "urlchatroom_messages_archived_total",
+    "Messages moved to messages_archive by this worker.",
+    "counter",
+    lambda: [((), message_archiver.archived_total)],
+)
+metrics.callback(
+    "urlchatroom_magic_link_tokens_reclaimed_total",
+    "Magic link tokens deleted by this worker's sweeper.",
+    "counter",
+    lambda: [((), magic_link_sweeper.reclaimed_total)],
+)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
 
 def _to_user_read(user: User) -> UserRead:
@@ -66,9 +195,13 @@ async def _get_user_by_email(db: AsyncSession, email: str) -> User | None:
     return result.scalar_one_or_none()
 
 
-async def _get_current_user(authorization: str | None, db: AsyncSession) -> User:
-    raw_token = _parse_bearer_token(authorization)
-    payload = decode_access_token(raw_token)
+def _check_token_version(payload: dict, token_version: int) -> None:
+    if payload.get("ver", 0) != token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="token revoked")
+
+
+@metrics.timed(db_query_seconds, "load_token_user")
+async def _load_token_user(payload: dict, db: AsyncSession) -> User:
     user_id = int(payload["sub"])
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
@@ -77,51 +210,247 @@ async def _get_current_user(authorization: str | None, db: AsyncSession) -> User
     return user
 
 
-async def get_or_create_thread(session: AsyncSession, thread_key: str) -> Thread:
-    result = await session.execute(select(Thread).where(Thread.thread_key == thread_key))
-    thread = result.scalar_one_or_none()
-    if thread:
-        return thread
-    thread = Thread(thread_key=thread_key)
-    session.add(thread)
-    await session.flush()
-    return thread
+async def _get_current_user(authorization: str | None, db: AsyncSession) -> User:
+    raw_token = _parse_bearer_token(authorization)
+    payload = decode_access_token(raw_token)
+    user = await _load_token_user(payload, db)
+    _check_token_version(payload, user.token_version)
+    return user
+
+
+async def _get_authenticated_user(authorization: str | None, db: AsyncSession) -> UserRead:
+    if not settings.auth_stateless:
+        return _to_user_read(await _get_current_user(authorization, db))
+
+    raw_token = _parse_bearer_token(authorization)
+    payload = decode_access_token(raw_token)
+    user_id = int(payload["sub"])
+    cached = user_cache.get(user_id)
+    if cached is None:
+        user = await _load_token_user(payload, db)
+        cached = (_to_user_read(user), user.token_version)
+        user_cache.set(user_id, cached)
+    user_read, token_version = cached
+    _check_token_version(payload, token_version)
+    return user_read
+
+
+async def resolve_thread_id(session: AsyncSession, thread_key: str) -> int | None:
+    thread_id = thread_ids.get(thread_key)
+    if thread_id is not None:
+        return thread_id
+    result = await session.execute(select(Thread.id).where(Thread.thread_key == thread_key))
+    thread_id = result.scalar_one_or_none()
+    if thread_id is not None:
+        thread_ids.set(thread_key, thread_id)
+    return thread_id
+
+
+@metrics.timed(db_query_seconds, "get_or_create_thread")
+async def get_or_create_thread(session: AsyncSession, thread_key: str) -> int:
+    thread_id = await resolve_thread_id(session, thread_key)
+    if thread_id is not None:
+        return thread_id
+    insert = dialect_insert(session)
+    result = await session.execute(
+        insert(Thread)
+        .values(thread_key=thread_key)
+        .on_conflict_do_nothing(index_elements=[Thread.thread_key])
+        .returning(Thread.id)
+    )
+    thread_id = result.scalar_one_or_none()
+    if thread_id is None:
+        result = await session.execute(select(Thread.id).where(Thread.thread_key == thread_key))
+        thread_id = result.scalar_one()
+    return thread_id
+
+
+def _to_message_read(message: Message, thread_key: str) -> MessageRead:
+    return MessageRead(
+        id=message.id,
+        thread_key=thread_key,
+        client_id=message.client_id,
+        content=message.content,
+        created_at=message.created_at,
+    )
+
+
+def _next_cursor(message_ids: list[int], limit: int, after_id: int | None) -> str | None:
+    if after_id is not None:
+        return encode_cursor(CURSOR_AFTER, message_ids[-1] if message_ids else after_id)
+    if len(message_ids) == limit:
+        return encode_cursor(CURSOR_BEFORE, message_ids[0])
+    return None
+
+
+def _page_etag(message_ids: list[int], limit: int) -> str:
+    if not message_ids:
+        return f'W/"0-0-{limit}"'
+    return f'W/"{message_ids[0]}-{message_ids[-1]}-{limit}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _page_headers(message_ids: list[int], limit: int, after_id: int | None, latest_page: bool) -> dict[str, str]:
+    headers = {}
+    next_cursor = _next_cursor(message_ids, limit, after_id)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if latest_page:
+        headers["ETag"] = _page_etag(message_ids, limit)
+        headers["Cache-Control"] = "no-cache"
+    return headers
+
+
+def _messages_response(
+    messages: list[CachedMessage],
+    limit: int,
+    after_id: int | None,
+    latest_page: bool = False,
+) -> Response:
+    headers = _page_headers([message_id for message_id, _ in messages], limit, after_id, latest_page)
+    return Response(content=render_messages(messages), media_type="application/json", headers=headers)
+
+
+async def _latest_page_ids(db: AsyncSession, thread_key: str, limit: int) -> list[int]:
+    cached = message_cache.latest(thread_key, limit)
+    if cached is not None:
+        return [message_id for message_id, _ in cached]
+    thread_id = await resolve_thread_id(db, thread_key)
+    if thread_id is None:
+        return []
+    result = await db.execute(
+        select(Message.id)
+        .where(Message.thread_id == thread_id)
+        .order_by(Message.id.desc())
+        .limit(limit)
+    )
+    return list(reversed(result.scalars().all()))
+
+
+@metrics.timed(db_query_seconds, "list_messages")
+async def _fetch_message_page(
+    db: AsyncSession,
+    thread_id: int,
+    limit: int,
+    before_id: int | None,
+    after_id: int | None,
+) -> list[Message]:
+    messages_q = select(Message).where(Message.thread_id == thread_id)
+    if after_id is not None:
+        messages_q = messages_q.where(Message.id > after_id).order_by(Message.id.asc()).limit(limit)
+        messages_res = await db.execute(messages_q)
+        return list(messages_res.scalars().all())
+
+    if before_id is not None:
+        messages_q = messages_q.where(Message.id < before_id)
+    messages_q = messages_q.order_by(Message.id.desc()).limit(limit)
+    messages_res = await db.execute(messages_q)
+    return list(reversed(messages_res.scalars().all()))
+
+
+async def _load_messages(
+    db: AsyncSession,
+    thread_key: str,
+    limit: int,
+    before_id: int | None,
+    after_id: int | None,
+    fill_cache: bool = True,
+) -> list[CachedMessage]:
+    if before_id is None:
+        if after_id is None:
+            cached = message_cache.latest(thread_key, limit)
+        else:
+            cached = message_cache.after(thread_key, after_id, limit)
+        if cached is not None:
+            return cached
+
+    if before_id is None and after_id is None and fill_cache:
+        with message_cache.filling(thread_key):
+            thread_id = await resolve_thread_id(db, thread_key)
+            if thread_id is None:
+                message_cache.fill(thread_key, [], complete=True)
+                return []
+            rows = await _fetch_message_page(db, thread_id, max(limit, message_cache.tail_size), None, None)
+            messages = [encode_message(_to_message_read(m, thread_key)) for m in rows]
+            message_cache.fill(thread_key, messages, complete=len(rows) < message_cache.tail_size)
+        return messages[-limit:]
+
+    thread_id = await resolve_thread_id(db, thread_key)
+    if thread_id is None:
+        return []
+    rows = await _fetch_message_page(db, thread_id, limit, before_id, after_id)
+    return [encode_message(_to_message_read(m, thread_key)) for m in rows]
+
+
+async def _latest_page_response(
+    db: AsyncSession,
+    thread_key: str,
+    limit: int,
+    if_none_match: str | None,
+    fill_cache: bool,
+) -> Response:
+    if if_none_match:
+        message_ids = await _latest_page_ids(db, thread_key, limit)
+        if _etag_matches(if_none_match, _page_etag(message_ids, limit)):
+            return Response(status_code=304, headers=_page_headers(message_ids, limit, None, True))
+    messages = await _load_messages(db, thread_key, limit, None, None, fill_cache)
+    return _messages_response(messages, limit, None, latest_page=True)
+
+
+@metrics.timed(db_query_seconds, "ws_replay")
+async def _load_replay(thread_key: str, last_id: int, limit: int) -> tuple[list[CachedMessage], bool]:
+    async with SessionLocal() as db:
+        thread_id = await resolve_thread_id(db, thread_key)
+        if thread_id is None:
+            return [], False
+        replay_q = select(Message).where(Message.thread_id == thread_id, Message.id > last_id)
+        result = await db.execute(replay_q.order_by(Message.id.desc()).limit(limit + 1))
+        rows = list(result.scalars().all())
+    gap = last_id > 0 and len(rows) > limit
+    return [encode_message(_to_message_read(m, thread_key)) for m in reversed(rows[:limit])], gap
 
 
 @router.get("/messages", response_model=list[MessageRead])
 async def list_messages(
     thread_key: str = Query(min_length=1, max_length=1200),
     limit: int = Query(default=50, ge=1, le=200),
-    db: AsyncSession = Depends(get_db),
-) -> list[MessageRead]:
+    before_id: int | None = Query(default=None, ge=1),
+    after_id: int | None = Query(default=None, ge=0),
+    cursor: str | None = Query(default=None, max_length=64),
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db),
+) -> Response:
     try:
         thread_key = normalize_thread_key(thread_key)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    result = await db.execute(select(Thread).where(Thread.thread_key == thread_key))
-    thread = result.scalar_one_or_none()
-    if thread is None:
-        return []
+    if cursor is not None:
+        try:
+            direction, cursor_id = decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        if direction == CURSOR_AFTER:
+            after_id = cursor_id
+        else:
+            before_id = cursor_id
+    if before_id is not None and after_id is not None:
+        raise HTTPException(status_code=400, detail="before_id and after_id are mutually exclusive")
 
-    messages_q = (
-        select(Message)
-        .where(Message.thread_id == thread.id)
-        .order_by(Message.created_at.desc())
-        .limit(limit)
-    )
-    messages_res = await db.execute(messages_q)
-    rows = list(reversed(messages_res.scalars().all()))
-    return [
-        MessageRead(
-            id=m.id,
-            thread_key=thread_key,
-            client_id=m.client_id,
-            content=m.content,
-            created_at=m.created_at,
-        )
-        for m in rows
-    ]
+    if before_id is None and after_id is None:
+        if read_engine is engine or not ws_hub.subscriber_count(thread_key):
+            return await _latest_page_response(db, thread_key, limit, if_none_match, fill_cache=read_engine is engine)
+        async with SessionLocal() as primary:
+            return await _latest_page_response(primary, thread_key, limit, if_none_match, fill_cache=True)
+
+    messages = await _load_messages(db, thread_key, limit, before_id, after_id)
+    return _messages_response(messages, limit, after_id)
 
 
 @router.post("/messages", response_model=MessageRead)
@@ -131,7 +460,7 @@ async def create_message(
     authorization: str | None = Header(default=None, alias="Authorization"),
     db: AsyncSession = Depends(get_db),
 ) -> MessageRead:
-    auth_user = await _get_current_user(authorization, db)
+    auth_user = await _get_authenticated_user(authorization, db)
 
     try:
         payload.thread_key = normalize_thread_key(payload.thread_key)
@@ -141,32 +470,81 @@ async def create_message(
     client_ip = request.client.host if request.client else "unknown"
     payload.client_id = auth_user.display_name
     rate_key = f"{auth_user.id}:{client_ip}"
-    if not post_limiter.allow(rate_key):
+    if not await post_limiter.hit(rate_key, db):
+        if metrics.enabled:
+            rate_limit_rejections.inc("post_messages")
         raise HTTPException(status_code=429, detail="rate limit exceeded")
 
-    thread = await get_or_create_thread(db, payload.thread_key)
+    thread_id = await get_or_create_thread(db, payload.thread_key)
 
-    message = Message(thread_id=thread.id, client_id=payload.client_id, content=payload.content)
-    db.add(message)
-    await db.commit()
-    await db.refresh(message)
+    if message_batcher is not None:
+        await db.commit()
+        message_id, created_at = await message_batcher.submit(
+            thread_id=thread_id,
+            client_id=payload.client_id,
+            content=payload.content,
+        )
+        response = MessageRead(
+            id=message_id,
+            thread_key=payload.thread_key,
+            client_id=payload.client_id,
+            content=payload.content,
+            created_at=created_at,
+        )
+    else:
+        message = Message(thread_id=thread_id, client_id=payload.client_id, content=payload.content)
+        db.add(message)
+        await db.commit()
+        await db.refresh(message)
+        response = _to_message_read(message, payload.thread_key)
+    thread_ids.set(payload.thread_key, thread_id)
+
+    encoded = encode_message(response)
+    await ws_hub.broadcast_frame(payload.thread_key, encode_frame("message", encoded[1]), response.id, db)
+    return Response(content=encoded[1], media_type="application/json")
+
+
+@router.post("/threads/activity", response_model=list[ThreadActivity])
+async def thread_activity(
+    payload: ThreadActivityRequest,
+    db: AsyncSession = Depends(get_read_db),
+) -> list[ThreadActivity]:
+    try:
+        thread_keys = [normalize_thread_key(key) for key in payload.thread_keys]
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    response = MessageRead(
-        id=message.id,
-        thread_key=thread.thread_key,
-        client_id=message.client_id,
-        content=message.content,
-        created_at=message.created_at,
+    recent = (
+        select(Message.id)
+        .where(Message.thread_id == Thread.id)
+        .limit(settings.thread_activity_count_cap)
+        .correlate(Thread)
+        .subquery()
     )
-
-    await ws_hub.broadcast(
-        thread.thread_key,
-        {
-            "type": "message",
-            "data": response.model_dump(mode="json"),
-        },
+    message_count = select(func.count()).select_from(recent).scalar_subquery()
+    last_message_at = (
+        select(Message.created_at)
+        .where(Message.thread_id == Thread.id)
+        .order_by(Message.id.desc())
+        .limit(1)
+        .scalar_subquery()
     )
-    return response
+    result = await db.execute(
+        select(Thread.thread_key, message_count, last_message_at).where(Thread.thread_key.in_(set(thread_keys)))
+    )
+    stats = {key: (count, last_at) for key, count, last_at in result.all()}
+    activity = []
+    for key in thread_keys:
+        message_count, last_message_at = stats.get(key, (0, None))
+        activity.append(
+            ThreadActivity(
+                thread_key=key,
+                live_count=ws_hub.subscriber_count(key),
+                message_count=message_count,
+                last_message_at=last_message_at,
+            )
+        )
+    return activity
 
 
 @router.post("/auth/magic/request", response_model=MagicLinkRequestResponse)
@@ -183,7 +561,7 @@ async def request_magic_link(payload: MagicLinkRequest, db: AsyncSession = Depen
     expires_at = now_utc() + timedelta(minutes=settings.magic_link_ttl_minutes)
     db.add(MagicLinkToken(user_id=user.id, token_hash=token_hash(raw_token), expires_at=expires_at, used=False))
     await db.commit()
-    send_magic_link_email(
+    magic_link_mailer.send_magic_link(
         to_email=user.email,
         magic_link_url=build_magic_link(raw_token),
         expires_minutes=settings.magic_link_ttl_minutes,
@@ -197,32 +575,36 @@ async def request_magic_link(payload: MagicLinkRequest, db: AsyncSession = Depen
 @router.post("/auth/magic/verify", response_model=SessionRead)
 async def verify_magic_link(payload: MagicLinkVerifyRequest, db: AsyncSession = Depends(get_db)) -> SessionRead:
     token_digest = token_hash(payload.token)
-    result = await db.execute(
-        select(MagicLinkToken, User)
-        .join(User, User.id == MagicLinkToken.user_id)
+    consumed = await db.execute(
+        update(MagicLinkToken)
         .where(
-            and_(
-                MagicLinkToken.token_hash == token_digest,
-                MagicLinkToken.used.is_(False),
-                MagicLinkToken.expires_at >= now_utc(),
-            )
+            MagicLinkToken.token_hash == token_digest,
+            ~MagicLinkToken.used,
+            MagicLinkToken.expires_at >= now_utc(),
         )
+        .values(used=True)
+        .returning(MagicLinkToken.user_id)
     )
-    row = result.first()
-    if row is None:
+    user_id = consumed.scalar_one_or_none()
+    user = await db.get(User, user_id) if user_id is not None else None
+    if user is None:
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="magic token is invalid or expired")
 
-    magic_token, user = row
-    magic_token.used = True
     user.last_login_at = now_utc()
-    access_token, expires_at = create_access_token(user_id=user.id, email=user.email, display_name=user.display_name)
+    access_token, expires_at = create_access_token(
+        user_id=user.id,
+        email=user.email,
+        display_name=user.display_name,
+        token_version=user.token_version,
+    )
     await db.commit()
     return SessionRead(access_token=access_token, expires_at=expires_at, user=_to_user_read(user))
 
 
 @router.post("/auth/google/verify", response_model=SessionRead)
 async def verify_google(payload: GoogleVerifyRequest, db: AsyncSession = Depends(get_db)) -> SessionRead:
-    info = verify_google_access_token(payload.access_token)
+    info = await google_verifier.verify(payload.access_token)
     email = normalize_email(info["email"])
     google_sub = str(info["sub"])
     requested_display_name = (payload.display_name or "").strip()
@@ -244,7 +626,12 @@ async def verify_google(payload: GoogleVerifyRequest, db: AsyncSession = Depends
                 user.display_name = requested_display_name[:64] if requested_display_name else fallback_display_name
 
     user.last_login_at = now_utc()
-    access_token, expires_at = create_access_token(user_id=user.id, email=user.email, display_name=user.display_name)
+    access_token, expires_at = create_access_token(
+        user_id=user.id,
+        email=user.email,
+        display_name=user.display_name,
+        token_version=user.token_version,
+    )
     await db.commit()
     return SessionRead(access_token=access_token, expires_at=expires_at, user=_to_user_read(user))
 
@@ -254,8 +641,7 @@ async def auth_me(
     authorization: str | None = Header(default=None, alias="Authorization"),
     db: AsyncSession = Depends(get_db),
 ) -> UserRead:
-    user = await _get_current_user(authorization, db)
-    return _to_user_read(user)
+    return await _get_authenticated_user(authorization, db)
 
 
 @router.patch("/auth/me", response_model=UserRead)
@@ -268,9 +654,21 @@ async def update_me(
     user.display_name = payload.display_name[:64]
     await db.commit()
     await db.refresh(user)
+    user_cache.pop(user.id)
     return _to_user_read(user)
 
 
+@router.post("/auth/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_tokens(
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: AsyncSession = Depends(get_db),
+) -> None:
+    user = await _get_current_user(authorization, db)
+    user.token_version += 1
+    await db.commit()
+    user_cache.pop(user.id)
+
+
 @ws_router.get("/auth/magic", response_class=HTMLResponse)
 async def magic_link_page(token: str = Query(default="")) -> HTMLResponse:
     safe_token = escape(token)
@@ -287,21 +685,62 @@ async def magic_link_page(token: str = Query(default="")) -> HTMLResponse:
     return HTMLResponse(content=body)
 
 
+def _control_frame(compact: bool, frame_type: str, data: dict) -> str:
+    if compact:
+        return json.dumps({"t": frame_type, "d": data}, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps({"type": frame_type, "data": data})
+
+
+def _history_frame(compact: bool, history: list[CachedMessage], gap: bool) -> str:
+    gap_flag = "true" if gap else "false"
+    if compact:
+        bodies = ",".join(compact_message(body) for _, body in history)
+        return f'{{"t":"history","d":[{bodies}],"g":{gap_flag}}}'
+    return f'{{"type":"history","data":{render_messages(history).decode("utf-8")},"gap":{gap_flag}}}'
+
+
 @ws_router.websocket("/ws/{thread_key:path}")
 async def websocket_endpoint(websocket: WebSocket, thread_key: str) -> None:
     client_id = websocket.query_params.get("client_id", "anonymous")
+    raw_last_id = websocket.query_params.get("last_id")
+    protocol = websocket.query_params.get("v", "1")
+    compact = protocol == "2"
     try:
+        if protocol not in ("1", "2"):
+            raise ValueError("v must be 1 or 2")
         thread_key = normalize_thread_key(thread_key)
+        last_id = None
+        if raw_last_id is not None:
+            if not raw_last_id.isdigit():
+                raise ValueError("last_id must be a non-negative integer")
+            last_id = int(raw_last_id)
     except ValueError as exc:
         await websocket.accept()
-        await websocket.send_json({"type": "error", "data": {"detail": str(exc)}})
+        await websocket.send_text(_control_frame(compact, "error", {"detail": str(exc)}))
         await websocket.close(code=1008)
         return
-    await ws_hub.connect(thread_key, websocket)
-    await websocket.send_json({"type": "system", "data": {"client_id": client_id, "status": "connected"}})
+    client_ip = websocket.client.host if websocket.client else "unknown"
+    if not await ws_hub.connect(thread_key, websocket, paused=True, client_ip=client_ip, compact=compact):
+        await websocket.accept()
+        await websocket.send_text(_control_frame(compact, "error", {"detail": "too many connections"}))
+        await websocket.close(code=CONNECTION_LIMIT_CLOSE_CODE)
+        return
 
     try:
+        preamble = [_control_frame(compact, "system", {"client_id": client_id, "status": "connected"})]
+        if last_id is not None:
+            history, gap = await _load_replay(thread_key, last_id, settings.ws_replay_limit)
+            preamble.append(_history_frame(compact, history, gap))
+        ws_hub.resume(thread_key, websocket, preamble)
+
+        idle_timeout = (settings.ws_idle_timeout_seconds or None) if compact else None
         while True:
-            await websocket.receive_text()
+            try:
+                await asyncio.wait_for(websocket.receive_text(), timeout=idle_timeout)
+            except TimeoutError:
+                ws_hub.evict(thread_key, websocket, IDLE_CLOSE_CODE)
+                return
     except WebSocketDisconnect:
+        pass
+    finally:
         ws_hub.disconnect(thread_key, websocket)
@@ -1,17 +1,82 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from pathlib import Path
+from uuid import uuid4
+
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import settings
+from app.services.metrics import InstrumentedAsyncQueuePool
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "migrations"
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.database_url, future=True)
+def _connect_args(url: str) -> dict:
+    if not url.startswith("postgresql+asyncpg"):
+        return {}
+    if settings.db_pgbouncer:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+    }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    if url.startswith("sqlite"):
+        return create_async_engine(url, future=True)
+    return create_async_engine(
+        url,
+        future=True,
+        poolclass=InstrumentedAsyncQueuePool if settings.metrics_enabled else AsyncAdaptedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=_connect_args(url),
+    )
+
+
+engine = create_engine(settings.database_url)
 SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+read_engine = create_engine(settings.database_read_url) if settings.database_read_url else engine
+ReadSessionLocal = async_sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
 
 
 async def get_db() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
+
+
+async def get_read_db() -> AsyncSession:
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+def dialect_insert(session: AsyncSession):
+    if session.bind.dialect.name == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
+
+
+async def check_schema_revision() -> None:
+    script = ScriptDirectory(str(MIGRATIONS_DIR))
+    expected = script.get_current_head()
+    async with engine.connect() as conn:
+        current = await conn.run_sync(lambda sync_conn: MigrationContext.configure(sync_conn).get_current_revision())
+    if current != expected:
+        raise RuntimeError(
+            f"database schema is at revision {current}, expected {expected}; run `alembic upgrade head` from backend/"
+        )
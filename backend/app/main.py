@@ -1,11 +1,58 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 
-from app.api.routes import router, ws_router
+from app.api.routes import (
+    google_verifier,
+    magic_link_mailer,
+    magic_link_sweeper,
+    message_archiver,
+    message_batcher,
+    router,
+    ws_hub,
+    ws_router,
+)
 from app.config import settings
-from app.db import Base, engine
+from app.db import check_schema_revision
+from app.services.metrics import RequestMetricsMiddleware, metrics
 
-app = FastAPI(title=settings.app_name)
+
+def _default_response_class() -> type[JSONResponse]:
+    if not settings.orjson_responses:
+        return JSONResponse
+    try:
+        import orjson  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError("ORJSON_RESPONSES requires the orjson package") from exc
+    return ORJSONResponse
+
+
+def _add_compression(app: FastAPI) -> None:
+    if settings.response_compression == "off":
+        return
+    if settings.response_compression == "brotli":
+        try:
+            from brotli_asgi import BrotliMiddleware
+        except ImportError as exc:
+            raise RuntimeError("RESPONSE_COMPRESSION=brotli requires the brotli-asgi package") from exc
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=settings.brotli_quality,
+            minimum_size=settings.compression_minimum_size,
+            gzip_fallback=True,
+        )
+        return
+    if settings.response_compression != "gzip":
+        raise RuntimeError("RESPONSE_COMPRESSION must be one of off, gzip, brotli")
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        compresslevel=settings.gzip_level,
+    )
+
+
+app = FastAPI(title=settings.app_name, default_response_class=_default_response_class())
 
 allow_origins = [o.strip() for o in settings.cors_allow_origins.split(",") if o.strip()]
 if allow_origins:
@@ -15,13 +62,36 @@ if allow_origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
     )
 
+_add_compression(app)
+
+if metrics.enabled:
+    app.add_middleware(RequestMetricsMiddleware)
+
 
 @app.on_event("startup")
 async def startup_event() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await check_schema_revision()
+    await ws_hub.start()
+    await google_verifier.start()
+    await magic_link_mailer.start()
+    if message_batcher is not None:
+        await message_batcher.start()
+    await message_archiver.start()
+    await magic_link_sweeper.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    await magic_link_sweeper.stop()
+    await message_archiver.stop()
+    if message_batcher is not None:
+        await message_batcher.stop()
+    await magic_link_mailer.stop()
+    await google_verifier.stop()
+    await ws_hub.stop()
 
 
 @app.get("/health")
@@ -29,5 +99,12 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+if metrics.enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint() -> PlainTextResponse:
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(router)
 app.include_router(ws_router)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Annotated
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -35,6 +36,17 @@ class MessageRead(BaseModel):
     created_at: datetime
 
 
+class ThreadActivityRequest(BaseModel):
+    thread_keys: list[Annotated[str, Field(min_length=1, max_length=1200)]] = Field(min_length=1, max_length=300)
+
+
+class ThreadActivity(BaseModel):
+    thread_key: str
+    live_count: int
+    message_count: int
+    last_message_at: datetime | None
+
+
 class ErrorResponse(BaseModel):
     detail: str
 
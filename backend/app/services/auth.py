@@ -6,11 +6,15 @@ import hmac
 import json
 import secrets
 from datetime import UTC, datetime, timedelta
+from functools import lru_cache
 from typing import Any
 
 from fastapi import HTTPException, status
 
 from app.config import settings
+from app.services.cache import LRUCache
+
+_verified_tokens: LRUCache[str, dict[str, Any]] = LRUCache(maxsize=settings.verified_token_cache_size)
 
 
 def now_utc() -> datetime:
@@ -45,7 +49,24 @@ def _unb64url(data: str) -> bytes:
     return base64.urlsafe_b64decode((data + pad).encode("utf-8"))
 
 
-def create_access_token(*, user_id: int, email: str, display_name: str) -> tuple[str, datetime]:
+@lru_cache(maxsize=4)
+def _hmac_key(secret: str) -> hmac.HMAC:
+    return hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+
+def _sign(encoded: str) -> str:
+    mac = _hmac_key(settings.auth_secret).copy()
+    mac.update(encoded.encode("utf-8"))
+    return mac.hexdigest()
+
+
+def create_access_token(
+    *,
+    user_id: int,
+    email: str,
+    display_name: str,
+    token_version: int = 0,
+) -> tuple[str, datetime]:
     expires_at = now_utc() + timedelta(seconds=settings.access_token_ttl_seconds)
     payload = {
         "sub": str(user_id),
@@ -53,29 +74,24 @@ def create_access_token(*, user_id: int, email: str, display_name: str) -> tuple
         "display_name": display_name,
         "exp": int(expires_at.timestamp()),
         "iat": int(now_utc().timestamp()),
+        "ver": token_version,
     }
     payload_bytes = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
     encoded = _b64url(payload_bytes)
-    signature = hmac.new(
-        settings.auth_secret.encode("utf-8"),
-        encoded.encode("utf-8"),
-        hashlib.sha256,
-    ).hexdigest()
-    return f"{encoded}.{signature}", expires_at
+    return f"{encoded}.{_sign(encoded)}", expires_at
 
 
 def decode_access_token(raw_token: str) -> dict[str, Any]:
+    cached = _verified_tokens.get(raw_token)
+    if cached is not None:
+        return cached
+
     try:
         encoded, signature = raw_token.split(".", 1)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token format") from exc
 
-    expected_sig = hmac.new(
-        settings.auth_secret.encode("utf-8"),
-        encoded.encode("utf-8"),
-        hashlib.sha256,
-    ).hexdigest()
-    if not hmac.compare_digest(signature, expected_sig):
+    if not hmac.compare_digest(signature, _sign(encoded)):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token signature")
 
     try:
@@ -84,8 +100,11 @@ def decode_access_token(raw_token: str) -> dict[str, Any]:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token payload") from exc
 
     exp = payload.get("exp")
-    if not isinstance(exp, int) or exp < int(now_utc().timestamp()):
+    now = int(now_utc().timestamp())
+    if not isinstance(exp, int) or exp < now:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="token expired")
+    if exp > now:
+        _verified_tokens.set(raw_token, payload, ttl_seconds=exp - now)
     return payload
 
 
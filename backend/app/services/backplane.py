@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections.abc import Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DeliverFn = Callable[[str, str, int | None], None]
+
+NOTIFY_PAYLOAD_LIMIT = 7999
+ENVELOPE_HEADER_RESERVE = 96
+
+
+def _split_utf8(data: bytes, size: int) -> list[str]:
+    chunks = []
+    start = 0
+    while start < len(data):
+        end = min(start + size, len(data))
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        chunks.append(data[start:end].decode("utf-8"))
+        start = end
+    return chunks or [""]
+
+
+class Backplane:
+    def __init__(self) -> None:
+        self._deliver: DeliverFn | None = None
+
+    def attach(self, deliver: DeliverFn) -> None:
+        self._deliver = deliver
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(
+        self, thread_key: str, frame: str, message_id: int | None = None, session: AsyncSession | None = None
+    ) -> None:
+        raise NotImplementedError
+
+
+class InProcessBackplane(Backplane):
+    async def publish(
+        self, thread_key: str, frame: str, message_id: int | None = None, session: AsyncSession | None = None
+    ) -> None:
+        if self._deliver is not None:
+            self._deliver(thread_key, frame, message_id)
+
+
+class PostgresBackplane(Backplane):
+    def __init__(self, engine: AsyncEngine, channel: str) -> None:
+        super().__init__()
+        self.engine = engine
+        self.channel = channel
+        self._origin = uuid.uuid4().hex
+        self._sequence = 0
+        self._partial: dict[tuple[str, str], list[str]] = {}
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def publish(
+        self, thread_key: str, frame: str, message_id: int | None = None, session: AsyncSession | None = None
+    ) -> None:
+        if self._deliver is not None:
+            self._deliver(thread_key, frame, message_id)
+
+        payloads = self._envelopes(thread_key, frame, message_id)
+        try:
+            if session is None:
+                async with self.engine.connect() as conn:
+                    await self._notify(conn, payloads)
+                    await conn.commit()
+            else:
+                await self._notify(session, payloads)
+                await session.commit()
+        except Exception:
+            logger.exception("failed to publish broadcast for %s", thread_key)
+
+    def _envelopes(self, thread_key: str, frame: str, message_id: int | None) -> list[str]:
+        self._sequence += 1
+        body = f"{thread_key}\n{'' if message_id is None else message_id}\n{frame}"
+        chunks = _split_utf8(body.encode("utf-8"), NOTIFY_PAYLOAD_LIMIT - ENVELOPE_HEADER_RESERVE)
+        return [
+            f"{self._origin}\n{self._sequence}\n{index}\n{len(chunks)}\n{chunk}" for index, chunk in enumerate(chunks)
+        ]
+
+    async def _notify(self, conn: AsyncConnection | AsyncSession, payloads: list[str]) -> None:
+        for payload in payloads:
+            await conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.channel, "payload": payload},
+            )
+
+    def _on_notify(self, _connection, _pid: int, _channel: str, payload: str) -> None:
+        origin, sequence, index, count, chunk = payload.split("\n", 4)
+        if origin == self._origin or self._deliver is None:
+            return
+        if count != "1":
+            key = (origin, sequence)
+            parts = self._partial.setdefault(key, [])
+            if int(index) != len(parts):
+                del self._partial[key]
+                return
+            parts.append(chunk)
+            if len(parts) < int(count):
+                return
+            del self._partial[key]
+            chunk = "".join(parts)
+        thread_key, message_id, frame = chunk.split("\n", 2)
+        self._deliver(thread_key, frame, int(message_id) if message_id else None)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    self._partial.clear()
+                    driver = raw.driver_connection
+                    lost = asyncio.Event()
+                    driver.add_termination_listener(lambda _conn: lost.set())
+                    await driver.add_listener(self.channel, self._on_notify)
+                    try:
+                        await lost.wait()
+                    finally:
+                        if not driver.is_closed():
+                            await driver.remove_listener(self.channel, self._on_notify)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("backplane listener failed; reconnecting")
+            await asyncio.sleep(1)
+
+
+def create_backplane(engine: AsyncEngine) -> Backplane:
+    if settings.ws_backplane == "memory":
+        return InProcessBackplane()
+    if settings.ws_backplane == "postgres":
+        return PostgresBackplane(engine, channel=settings.ws_backplane_channel)
+    raise ValueError(f"unknown ws_backplane: {settings.ws_backplane}")
@@ -1,44 +1,114 @@
 from __future__ import annotations
 
-import json
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+import asyncio
+import hashlib
+import time
 
+import httpx
 from fastapi import HTTPException, status
 
 from app.config import settings
+from app.services.cache import LRUCache
+from app.services.metrics import metrics, upstream_seconds
 
 
-def _http_get_json(url: str, headers: dict[str, str] | None = None) -> dict:
-    req = Request(url=url, headers=headers or {}, method="GET")
-    try:
-        with urlopen(req, timeout=15) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    except Exception as exc:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="google token is invalid") from exc
+class GoogleTokenVerifier:
+    def __init__(
+        self,
+        timeout_seconds: float = 15,
+        max_connections: int = 20,
+        cache_size: int = 1000,
+        cache_ttl_seconds: float = 300,
+    ) -> None:
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self._client: httpx.AsyncClient | None = None
+        self._verified: LRUCache[str, dict] = LRUCache(maxsize=cache_size, ttl_seconds=cache_ttl_seconds)
+        self._inflight: dict[str, asyncio.Future[dict]] = {}
 
+    async def start(self) -> None:
+        self._get_client()
 
-def verify_google_access_token(access_token: str) -> dict:
-    if not access_token:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="missing google access token")
+    async def stop(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
-    userinfo = _http_get_json(
-        "https://www.googleapis.com/oauth2/v3/userinfo",
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
 
-    if not userinfo.get("email_verified"):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="google email is not verified")
-    if not userinfo.get("email"):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="google account has no email")
-    if not userinfo.get("sub"):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="google account has no subject id")
+    async def _get_json(
+        self,
+        url: str,
+        service: str,
+        *,
+        headers: dict[str, str] | None = None,
+        params: dict | None = None,
+    ) -> dict:
+        start = time.perf_counter()
+        try:
+            resp = await self._get_client().get(url, headers=headers, params=params)
+            resp.raise_for_status()
+            if metrics.enabled:
+                upstream_seconds.observe(time.perf_counter() - start, service, "ok")
+            return resp.json()
+        except Exception as exc:
+            if metrics.enabled:
+                upstream_seconds.observe(time.perf_counter() - start, service, "error")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="google token is invalid") from exc
+
+    async def verify(self, access_token: str) -> dict:
+        if not access_token:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="missing google access token")
+
+        key = hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+        cached = self._verified.get(key)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._verify_upstream(key, access_token))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(inflight)
+
+    async def _verify_upstream(self, key: str, access_token: str) -> dict:
+        userinfo, tokeninfo = await asyncio.gather(
+            self._get_json(
+                settings.google_userinfo_url,
+                "google_userinfo",
+                headers={"Authorization": f"Bearer {access_token}"},
+            ),
+            self._get_json(
+                settings.google_tokeninfo_url,
+                "google_tokeninfo",
+                params={"access_token": access_token},
+            ),
+        )
+
+        if not userinfo.get("email_verified"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="google email is not verified")
+        if not userinfo.get("email"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="google account has no email")
+        if not userinfo.get("sub"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="google account has no subject id")
 
-    if settings.google_client_id:
-        tokeninfo_url = "https://www.googleapis.com/oauth2/v3/tokeninfo?" + urlencode({"access_token": access_token})
-        tokeninfo = _http_get_json(tokeninfo_url)
         aud = tokeninfo.get("aud")
-        if aud and aud != settings.google_client_id:
+        if settings.google_client_id and aud and aud != settings.google_client_id:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="google token audience mismatch")
 
-    return userinfo
+        ttl = self._verified.ttl_seconds
+        if str(tokeninfo.get("expires_in", "")).isdigit():
+            ttl = min(ttl, int(tokeninfo["expires_in"]))
+        if ttl > 0:
+            self._verified.set(key, userinfo, ttl_seconds=ttl)
+        return userinfo
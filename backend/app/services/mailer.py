@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import smtplib
+import time
 from email.message import EmailMessage
 
 from fastapi import HTTPException, status
 
 from app.config import settings
+from app.services.metrics import metrics, upstream_seconds
+
+logger = logging.getLogger(__name__)
 
 
 def _smtp_not_configured() -> HTTPException:
@@ -15,10 +21,7 @@ def _smtp_not_configured() -> HTTPException:
     )
 
 
-def send_magic_link_email(*, to_email: str, magic_link_url: str, expires_minutes: int) -> None:
-    if not settings.smtp_host or not settings.smtp_from_email:
-        raise _smtp_not_configured()
-
+def build_magic_link_email(*, to_email: str, magic_link_url: str, expires_minutes: int) -> EmailMessage:
     msg = EmailMessage()
     msg["Subject"] = "Your URLChatroom sign-in link"
     msg["From"] = settings.smtp_from_email
@@ -34,23 +37,93 @@ def send_magic_link_email(*, to_email: str, magic_link_url: str, expires_minutes
             ]
         )
     )
+    return msg
 
-    try:
-        if settings.smtp_use_ssl:
-            with smtplib.SMTP_SSL(settings.smtp_host, settings.smtp_port, timeout=15) as smtp:
-                if settings.smtp_username:
-                    smtp.login(settings.smtp_username, settings.smtp_password)
-                smtp.send_message(msg)
+
+class MagicLinkMailer:
+    def __init__(self, max_queue: int = 1000, max_attempts: int = 3, retry_backoff_seconds: float = 2.0) -> None:
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._queue: asyncio.Queue[EmailMessage | None] = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task | None = None
+        self._smtp: smtplib.SMTP | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
             return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        await asyncio.to_thread(self._disconnect)
+
+    def send_magic_link(self, *, to_email: str, magic_link_url: str, expires_minutes: int) -> None:
+        if not settings.smtp_host or not settings.smtp_from_email:
+            raise _smtp_not_configured()
+        if self._task is None:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="mailer is not running")
 
-        with smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=15) as smtp:
+        msg = build_magic_link_email(to_email=to_email, magic_link_url=magic_link_url, expires_minutes=expires_minutes)
+        try:
+            self._queue.put_nowait(msg)
+        except asyncio.QueueFull as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="too many pending emails, try again later",
+            ) from exc
+
+    async def _run(self) -> None:
+        while True:
+            msg = await self._queue.get()
+            if msg is None:
+                return
+            await self._deliver(msg)
+
+    async def _deliver(self, msg: EmailMessage) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._send, msg)
+                if metrics.enabled:
+                    upstream_seconds.observe(time.perf_counter() - start, "smtp", "ok")
+                return
+            except Exception:
+                if metrics.enabled:
+                    upstream_seconds.observe(time.perf_counter() - start, "smtp", "error")
+                await asyncio.to_thread(self._disconnect)
+                if attempt == self.max_attempts:
+                    logger.exception("failed to send magic link email to %s", msg["To"])
+                    return
+                await asyncio.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+
+    def _connect(self) -> smtplib.SMTP:
+        if settings.smtp_use_ssl:
+            smtp: smtplib.SMTP = smtplib.SMTP_SSL(settings.smtp_host, settings.smtp_port, timeout=15)
+        else:
+            smtp = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=15)
             if settings.smtp_use_tls:
                 smtp.starttls()
-            if settings.smtp_username:
-                smtp.login(settings.smtp_username, settings.smtp_password)
-            smtp.send_message(msg)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail="failed to send magic link email",
-        ) from exc
+        if settings.smtp_username:
+            smtp.login(settings.smtp_username, settings.smtp_password)
+        return smtp
+
+    def _send(self, msg: EmailMessage) -> None:
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._smtp = self._connect()
+            self._smtp.send_message(msg)
+
+    def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            pass
+        self._smtp = None
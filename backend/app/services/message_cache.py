@@ -0,0 +1,163 @@
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from app.schemas import MessageRead
+
+CachedMessage = tuple[int, bytes]
+
+
+class _ThreadTail:
+    __slots__ = ("messages", "complete", "expires_at", "size")
+
+    def __init__(self, messages: list[CachedMessage], complete: bool, expires_at: float) -> None:
+        self.messages = messages
+        self.complete = complete
+        self.expires_at = expires_at
+        self.size = 0
+
+
+class _PendingFill:
+    __slots__ = ("fills", "messages")
+
+    def __init__(self) -> None:
+        self.fills = 0
+        self.messages: list[CachedMessage] = []
+
+
+def encode_message(message: MessageRead) -> CachedMessage:
+    return message.id, message.model_dump_json().encode("utf-8")
+
+
+def render_messages(messages: list[CachedMessage]) -> bytes:
+    return b"[" + b",".join(body for _, body in messages) + b"]"
+
+
+class RecentMessageCache:
+    def __init__(self, max_threads: int, tail_size: int, ttl_seconds: float, max_bytes: int) -> None:
+        self.max_threads = max_threads
+        self.tail_size = tail_size
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._tails: OrderedDict[str, _ThreadTail] = OrderedDict()
+        self._pending: dict[str, _PendingFill] = {}
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._tails)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def latest(self, thread_key: str, limit: int) -> list[CachedMessage] | None:
+        tail = self._get(thread_key)
+        if tail is None or (len(tail.messages) < limit and not tail.complete):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return tail.messages[-limit:]
+
+    def after(self, thread_key: str, after_id: int, limit: int) -> list[CachedMessage] | None:
+        tail = self._get(thread_key)
+        if tail is not None:
+            index = bisect_right(tail.messages, after_id, key=lambda message: message[0])
+            if index > 0 or tail.complete:
+                self.hits += 1
+                return tail.messages[index : index + limit]
+        self.misses += 1
+        return None
+
+    @contextmanager
+    def filling(self, thread_key: str) -> Iterator[None]:
+        pending = self._pending.get(thread_key)
+        if pending is None:
+            pending = self._pending[thread_key] = _PendingFill()
+        pending.fills += 1
+        try:
+            yield
+        finally:
+            pending.fills -= 1
+            if not pending.fills:
+                del self._pending[thread_key]
+
+    def fill(self, thread_key: str, messages: list[CachedMessage], complete: bool) -> None:
+        newer = []
+        tail = self._get(thread_key)
+        if tail is not None:
+            newer.extend(tail.messages)
+        pending = self._pending.get(thread_key)
+        if pending is not None:
+            newer.extend(pending.messages)
+        if newer:
+            floor = 0 if complete or not messages else messages[0][0]
+            merged = dict(messages)
+            for message_id, body in newer:
+                if message_id >= floor:
+                    merged.setdefault(message_id, body)
+            messages = sorted(merged.items())
+        self._store(thread_key, messages, complete)
+
+    def append(self, thread_key: str, message: CachedMessage) -> None:
+        pending = self._pending.get(thread_key)
+        if pending is not None:
+            pending.messages.append(message)
+            if len(pending.messages) > self.tail_size:
+                del pending.messages[0]
+        tail = self._tails.get(thread_key)
+        if tail is None or tail.expires_at <= time.monotonic():
+            return
+        message_id = message[0]
+        messages = tail.messages
+        if not messages or message_id > messages[-1][0]:
+            messages.append(message)
+        else:
+            index = bisect_right(messages, message_id, key=lambda cached: cached[0])
+            if index and messages[index - 1][0] == message_id:
+                return
+            messages.insert(index, message)
+        added = len(message[1])
+        if len(messages) > self.tail_size:
+            tail.complete = False
+            added -= len(messages.pop(0)[1])
+        tail.size += added
+        self._bytes += added
+        self._shrink()
+
+    def invalidate(self, thread_key: str) -> None:
+        self._remove(thread_key)
+
+    def _get(self, thread_key: str) -> _ThreadTail | None:
+        tail = self._tails.get(thread_key)
+        if tail is None:
+            return None
+        if tail.expires_at <= time.monotonic():
+            self._remove(thread_key)
+            return None
+        self._tails.move_to_end(thread_key)
+        return tail
+
+    def _store(self, thread_key: str, messages: list[CachedMessage], complete: bool) -> None:
+        self._remove(thread_key)
+        if len(messages) > self.tail_size:
+            complete = False
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+        tail = _ThreadTail(messages[-self.tail_size :], complete, expires_at)
+        tail.size = len(thread_key) + sum(len(body) for _, body in tail.messages)
+        self._tails[thread_key] = tail
+        self._bytes += tail.size
+        self._shrink()
+
+    def _remove(self, thread_key: str) -> None:
+        tail = self._tails.pop(thread_key, None)
+        if tail is not None:
+            self._bytes -= tail.size
+
+    def _shrink(self) -> None:
+        while self._tails and (len(self._tails) > self.max_threads or self._bytes > self.max_bytes):
+            _, tail = self._tails.popitem(last=False)
+            self._bytes -= tail.size
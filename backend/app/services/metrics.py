@@ -0,0 +1,229 @@
+import time
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterable
+from functools import wraps
+from typing import ParamSpec, TypeVar
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+P = ParamSpec("P")
+R = TypeVar("R")
+M = TypeVar("M", bound="_Metric")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+
+def _format_labels(names: tuple[str, ...], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        collect: Callable[[], Iterable[tuple[Labels, float]]],
+        labelnames: tuple[str, ...] = (),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, value in self._collect():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._series: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, series in self._series.items():
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative:g}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {series[-2]}")
+            lines.append(f"{self.name}_count{suffix} {series[-1]:g}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        collect: Callable[[], Iterable[tuple[Labels, float]]],
+        labelnames: tuple[str, ...] = (),
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, kind, collect, labelnames))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def timed(
+        self,
+        histogram: Histogram,
+        *labels: str,
+    ) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+        def decorator(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+            if not self.enabled:
+                return func
+
+            @wraps(func)
+            async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start, *labels)
+
+            return wrapper
+
+        return decorator
+
+
+metrics = MetricsRegistry(enabled=settings.metrics_enabled)
+
+http_request_seconds = metrics.histogram(
+    "urlchatroom_http_request_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+db_query_seconds = metrics.histogram("urlchatroom_db_query_seconds", "Database time per call site.", ("site",))
+db_pool_checkout_seconds = metrics.histogram(
+    "urlchatroom_db_pool_checkout_seconds", "Time spent waiting for a pooled database connection."
+)
+ws_broadcast_seconds = metrics.histogram(
+    "urlchatroom_ws_broadcast_seconds", "Time to publish one broadcast and enqueue it for local subscribers."
+)
+rate_limit_rejections = metrics.counter(
+    "urlchatroom_rate_limit_rejections_total", "Requests refused by a rate limiter.", ("limiter",)
+)
+upstream_seconds = metrics.histogram(
+    "urlchatroom_upstream_seconds", "Latency of calls to external services.", ("service", "outcome")
+)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_seconds.observe(time.perf_counter() - start)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status_code,
+            )
@@ -1,10 +1,17 @@
+from functools import lru_cache
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
 TRACKING_PARAM_NAMES = {"ref", "fbclid", "gclid", "yclid", "mc_cid", "mc_eid"}
 TRACKING_PARAM_PREFIXES = ("utm_",)
+NORMALIZE_CACHE_SIZE = 4096
 
 
-def normalize_url(raw_url: str) -> str:
+def _is_tracking_param(key: str) -> bool:
+    lower = key.lower()
+    return lower in TRACKING_PARAM_NAMES or lower.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def _normalize_url(raw_url: str) -> str:
     parsed = urlparse(raw_url.strip())
     if not parsed.netloc:
         raise ValueError("invalid URL")
@@ -15,16 +22,11 @@ def normalize_url(raw_url: str) -> str:
 
     scheme = "https"
 
-    params = parse_qsl(parsed.query, keep_blank_values=True)
-    kept = []
-    for key, value in params:
-        lower = key.lower()
-        if lower in TRACKING_PARAM_NAMES or any(lower.startswith(p) for p in TRACKING_PARAM_PREFIXES):
-            continue
-        kept.append((key, value))
-
-    kept.sort(key=lambda x: (x[0], x[1]))
-    query = urlencode(kept, doseq=True)
+    query = ""
+    if parsed.query:
+        kept = [item for item in parse_qsl(parsed.query, keep_blank_values=True) if not _is_tracking_param(item[0])]
+        kept.sort()
+        query = urlencode(kept, doseq=True)
 
     path = parsed.path or "/"
     if path != "/":
@@ -36,9 +38,15 @@ def normalize_url(raw_url: str) -> str:
     return normalized
 
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_url(raw_url: str) -> str:
+    return _normalize_url(raw_url)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_thread_key(thread_key: str) -> str:
     if not thread_key.startswith("url:"):
         raise ValueError("thread_key must start with 'url:'")
     raw_url = thread_key[4:]
-    normalized = normalize_url(raw_url)
+    normalized = _normalize_url(raw_url)
     return f"url:{normalized}"
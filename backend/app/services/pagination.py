@@ -0,0 +1,21 @@
+import base64
+
+CURSOR_BEFORE = "b"
+CURSOR_AFTER = "a"
+
+
+def encode_cursor(direction: str, message_id: int) -> str:
+    raw = f"{direction}:{message_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    pad = "=" * (-len(cursor) % 4)
+    try:
+        direction, _, raw_id = base64.urlsafe_b64decode(cursor + pad).decode("ascii").partition(":")
+        message_id = int(raw_id)
+    except ValueError as exc:
+        raise ValueError("invalid cursor") from exc
+    if direction not in (CURSOR_BEFORE, CURSOR_AFTER) or message_id < 0:
+        raise ValueError("invalid cursor")
+    return direction, message_id
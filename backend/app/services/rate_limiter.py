@@ -1,19 +1,160 @@
+import asyncio
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict
 
+from sqlalchemy import case, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 
-class InMemoryRateLimiter:
-    def __init__(self, max_events: int, window_seconds: int):
+from app.config import settings
+from app.db import dialect_insert
+from app.models import RateLimitCounter
+from app.services.cache import LRUCache
+
+
+class RateLimiter:
+    async def hit(self, key: str, session: AsyncSession) -> bool:
+        raise NotImplementedError
+
+
+class InMemoryRateLimiter(RateLimiter):
+    def __init__(
+        self,
+        max_events: int,
+        window_seconds: int,
+        max_keys: int = 100_000,
+        shards: int = 16,
+        sweep_interval_seconds: float = 60.0,
+    ):
         self.max_events = max_events
         self.window_seconds = window_seconds
-        self._events = defaultdict(deque)
+        self.max_keys = max_keys
+        self._emission_interval = window_seconds / max_events
+        self._burst_tolerance = window_seconds - self._emission_interval
+        self._shards: list[OrderedDict[str, float]] = [OrderedDict() for _ in range(shards)]
+        self._shard_max_keys = max(1, max_keys // shards)
+        self._sweep_step = sweep_interval_seconds / shards
+        self._next_sweep = time.monotonic() + self._sweep_step
+        self._sweep_cursor = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
 
     def allow(self, key: str) -> bool:
-        now = time.time()
-        q = self._events[key]
-        while q and now - q[0] > self.window_seconds:
-            q.popleft()
-        if len(q) >= self.max_events:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        shard = self._shards[hash(key) % len(self._shards)]
+        tat = max(shard.get(key, now), now)
+        if tat - now > self._burst_tolerance:
             return False
-        q.append(now)
+        shard[key] = tat + self._emission_interval
+        shard.move_to_end(key)
+        if len(shard) > self._shard_max_keys:
+            shard.popitem(last=False)
         return True
+
+    async def hit(self, key: str, session: AsyncSession) -> bool:
+        return self.allow(key)
+
+    def _sweep(self, now: float) -> None:
+        shard = self._shards[self._sweep_cursor]
+        for key in [key for key, tat in shard.items() if tat <= now]:
+            del shard[key]
+        self._sweep_cursor = (self._sweep_cursor + 1) % len(self._shards)
+        self._next_sweep = now + self._sweep_step
+
+
+class _LocalWindow:
+    __slots__ = ("window_start", "known", "pending", "inflight", "lock")
+
+    def __init__(self, window_start: int) -> None:
+        self.window_start = window_start
+        self.known = 0
+        self.pending = 0
+        self.inflight = 0
+        self.lock = asyncio.Lock()
+
+
+class DatabaseRateLimiter(RateLimiter):
+    def __init__(
+        self,
+        max_events: int,
+        window_seconds: int,
+        local_budget: int = 0,
+        workers: int = 1,
+        max_keys: int = 100_000,
+    ):
+        self.max_events = max_events
+        self.window_seconds = window_seconds
+        self.local_budget = min(local_budget, max_events // max(workers, 1))
+        self._local: LRUCache[str, _LocalWindow] = LRUCache(maxsize=max_keys)
+        self._next_cleanup = 0.0
+
+    async def hit(self, key: str, session: AsyncSession) -> bool:
+        now = time.time()
+        window_start = int(now // self.window_seconds) * self.window_seconds
+        state = self._local.get(key)
+        if state is None or state.window_start != window_start:
+            state = _LocalWindow(window_start)
+            self._local.set(key, state)
+
+        if state.known >= self.max_events:
+            return False
+        if state.known + state.pending + state.inflight < self.local_budget:
+            state.pending += 1
+            return True
+
+        async with state.lock:
+            if state.known >= self.max_events:
+                return False
+            increment = state.pending + 1
+            state.pending = 0
+            state.inflight += increment
+            try:
+                state.known = await self._increment(session, key, window_start, increment, now)
+            finally:
+                state.inflight -= increment
+            return state.known <= self.max_events
+
+    async def _increment(self, session: AsyncSession, key: str, window_start: int, increment: int, now: float) -> int:
+        insert = dialect_insert(session)
+        stmt = insert(RateLimitCounter).values(key=key, window_start=window_start, count=increment)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitCounter.key],
+            set_={
+                "count": case(
+                    (
+                        RateLimitCounter.window_start == stmt.excluded.window_start,
+                        RateLimitCounter.count + stmt.excluded.count,
+                    ),
+                    else_=stmt.excluded.count,
+                ),
+                "window_start": stmt.excluded.window_start,
+            },
+        ).returning(RateLimitCounter.count)
+        result = await session.execute(stmt)
+        count = result.scalar_one()
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + self.window_seconds
+            await session.execute(delete(RateLimitCounter).where(RateLimitCounter.window_start < window_start))
+        await session.commit()
+        return count
+
+
+def create_rate_limiter(max_events: int, window_seconds: int) -> RateLimiter:
+    if settings.rate_limit_backend == "memory":
+        return InMemoryRateLimiter(
+            max_events=max_events,
+            window_seconds=window_seconds,
+            max_keys=settings.rate_limit_max_keys,
+        )
+    if settings.rate_limit_backend == "database":
+        return DatabaseRateLimiter(
+            max_events=max_events,
+            window_seconds=window_seconds,
+            local_budget=settings.rate_limit_local_budget,
+            workers=settings.rate_limit_workers,
+            max_keys=settings.rate_limit_max_keys,
+        )
+    raise ValueError(f"unknown rate_limit_backend: {settings.rate_limit_backend}")
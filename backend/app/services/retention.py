@@ -0,0 +1,98 @@
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import ArchivedMessage, Message, Thread
+from app.services.message_cache import RecentMessageCache
+from app.services.periodic import PeriodicJob
+
+
+class MessageArchiver(PeriodicJob):
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        message_cache: RecentMessageCache,
+        default_retention_days: int,
+        interval_seconds: float,
+        batch_size: int,
+    ) -> None:
+        super().__init__(interval_seconds)
+        self.session_factory = session_factory
+        self.message_cache = message_cache
+        self.default_retention_days = default_retention_days
+        self.batch_size = batch_size
+        self.archived_total = 0
+
+    async def run_once(self) -> int:
+        moved = 0
+        for retention_days in await self._retention_classes():
+            cutoff = datetime.now(UTC) - timedelta(days=retention_days)
+            last_id = await self._last_expired_id(cutoff)
+            after_id = 0
+            while last_id is not None:
+                count, after_id = await self._archive_batch(retention_days, cutoff, after_id, last_id)
+                moved += count
+                if count < self.batch_size:
+                    break
+        self.archived_total += moved
+        return moved
+
+    async def _retention_classes(self) -> list[int]:
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Thread.retention_days).where(Thread.retention_days > 0).distinct()
+            )
+            days = set(result.scalars().all())
+        if self.default_retention_days > 0:
+            days.add(self.default_retention_days)
+        return sorted(days)
+
+    async def _last_expired_id(self, cutoff: datetime) -> int | None:
+        async with self.session_factory() as session:
+            result = await session.execute(select(func.max(Message.id)).where(Message.created_at < cutoff))
+            return result.scalar_one_or_none()
+
+    async def _archive_batch(
+        self, retention_days: int, cutoff: datetime, after_id: int, last_id: int
+    ) -> tuple[int, int]:
+        if retention_days == self.default_retention_days:
+            thread_filter = (Thread.retention_days.is_(None)) | (Thread.retention_days == retention_days)
+        else:
+            thread_filter = Thread.retention_days == retention_days
+        threads = select(Thread.id).where(thread_filter)
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                due = (
+                    select(Message.id, Message.thread_id)
+                    .where(
+                        Message.id > after_id,
+                        Message.id <= last_id,
+                        Message.thread_id.in_(threads),
+                        Message.created_at < cutoff,
+                    )
+                    .order_by(Message.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                rows = (await session.execute(due)).all()
+                if not rows:
+                    return 0, last_id
+                ids = [row.id for row in rows]
+                await session.execute(
+                    insert(ArchivedMessage).from_select(
+                        ["id", "thread_id", "client_id", "content", "created_at"],
+                        select(Message.id, Message.thread_id, Message.client_id, Message.content, Message.created_at)
+                        .where(Message.id.in_(ids)),
+                    )
+                )
+                await session.execute(delete(Message).where(Message.id.in_(ids)))
+                keys = await session.execute(
+                    select(Thread.thread_key).where(Thread.id.in_({row.thread_id for row in rows}))
+                )
+                thread_keys = keys.scalars().all()
+
+        for thread_key in thread_keys:
+            self.message_cache.invalidate(thread_key)
+        return len(ids), ids[-1]
@@ -0,0 +1,42 @@
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import MagicLinkToken
+from app.services.auth import now_utc
+from app.services.periodic import PeriodicJob
+
+
+class MagicLinkTokenSweeper(PeriodicJob):
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        interval_seconds: float,
+        batch_size: int,
+    ) -> None:
+        super().__init__(interval_seconds)
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.reclaimed_total = 0
+
+    async def run_once(self) -> int:
+        reclaimed = 0
+        while True:
+            count = await self._sweep_batch()
+            reclaimed += count
+            self.reclaimed_total += count
+            if count < self.batch_size:
+                return reclaimed
+
+    async def _sweep_batch(self) -> int:
+        async with self.session_factory() as session:
+            async with session.begin():
+                due = (
+                    select(MagicLinkToken.id)
+                    .where(or_(MagicLinkToken.used, MagicLinkToken.expires_at < now_utc()))
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                ids = (await session.execute(due)).scalars().all()
+                if ids:
+                    await session.execute(delete(MagicLinkToken).where(MagicLinkToken.id.in_(ids)))
+        return len(ids)
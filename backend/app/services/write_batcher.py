@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import Message
+
+logger = logging.getLogger(__name__)
+
+_PendingRow = tuple[dict, asyncio.Future]
+
+
+class MessageWriteBatcher:
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], max_batch: int, linger_ms: float) -> None:
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.linger_seconds = linger_ms / 1000
+        self._queue: asyncio.Queue[_PendingRow | None] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, *, thread_id: int, client_id: str, content: str) -> tuple[int, datetime]:
+        if self._task is None:
+            raise RuntimeError("message batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(({"thread_id": thread_id, "client_id": client_id, "content": content}, future))
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            if batch[0] is not None and self.linger_seconds > 0 and self._queue.qsize() + 1 < self.max_batch:
+                await asyncio.sleep(self.linger_seconds)
+            while batch[-1] is not None and len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+            if batch:
+                await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: list[_PendingRow]) -> None:
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    insert(Message).returning(Message.id, Message.created_at, sort_by_parameter_order=True),
+                    [row for row, _ in batch],
+                )
+                inserted = result.all()
+                await session.commit()
+        except Exception as exc:
+            logger.exception("failed to insert batch of %d messages", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), row in zip(batch, inserted):
+            if not future.done():
+                future.set_result((row.id, row.created_at))
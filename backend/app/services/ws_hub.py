@@ -1,24 +1,261 @@
+import asyncio
+import json
+import time
 from collections import defaultdict
+from collections.abc import Callable
+from datetime import UTC, datetime
 
 from fastapi import WebSocket
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.backplane import Backplane, InProcessBackplane
+from app.services.metrics import metrics, ws_broadcast_seconds
+
+SLOW_CONSUMER_CLOSE_CODE = 1013
+CONNECTION_LIMIT_CLOSE_CODE = 1013
+IDLE_CLOSE_CODE = 1001
+PING_FRAME = '{"type":"ping"}'
+COMPACT_PING_FRAME = '{"t":"ping"}'
+MESSAGE_FRAME_PREFIX = '{"type":"message","data":'
+
+_QueueItem = tuple[str, bool]
+
+
+def encode_frame(frame_type: str, data: bytes) -> str:
+    return f'{{"type":"{frame_type}","data":{data.decode("utf-8")}}}'
+
+
+def encode_compact_frame(frame_type: str, data: str) -> str:
+    return f'{{"t":"{frame_type}","d":{data}}}'
+
+
+def compact_message(data: str | bytes) -> str:
+    message = json.loads(data)
+    created_at = datetime.fromisoformat(message["created_at"])
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=UTC)
+    return json.dumps(
+        {
+            "i": message["id"],
+            "c": message["client_id"],
+            "m": message["content"],
+            "s": int(created_at.timestamp() * 1000),
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def _compact_payload(payload: dict) -> str:
+    return json.dumps({"t": payload.get("type"), "d": payload.get("data")}, ensure_ascii=False, separators=(",", ":"))
+
+
+def _compact_item(frame: str) -> _QueueItem:
+    if frame.startswith(MESSAGE_FRAME_PREFIX):
+        return compact_message(frame[len(MESSAGE_FRAME_PREFIX) : -1]), True
+    return _compact_payload(json.loads(frame)), False
+
+
+class _Subscriber:
+    def __init__(self, websocket: WebSocket, max_queue: int, client_ip: str, compact: bool) -> None:
+        self.websocket = websocket
+        self.client_ip = client_ip
+        self.compact = compact
+        self.queue: asyncio.Queue[_QueueItem] = asyncio.Queue(maxsize=max_queue)
+        self.task: asyncio.Task | None = None
 
 
 class WebSocketHub:
-    def __init__(self) -> None:
-        self._connections: dict[str, set[WebSocket]] = defaultdict(set)
+    def __init__(
+        self,
+        max_queue: int = 64,
+        backplane: Backplane | None = None,
+        heartbeat_seconds: float = 25,
+        max_connections: int = 10000,
+        max_connections_per_ip: int = 20,
+        max_batch: int = 50,
+        on_message: Callable[[str, int, str], None] | None = None,
+    ) -> None:
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self.on_message = on_message
+        self.backplane = backplane or InProcessBackplane()
+        self.backplane.attach(self._deliver)
+        self._connections: dict[str, dict[WebSocket, _Subscriber]] = defaultdict(dict)
+        self._connections_per_ip: dict[str, int] = defaultdict(int)
+        self._connection_count = 0
+        self._closing: set[asyncio.Task] = set()
+        self._heartbeat_task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        await self.backplane.start()
+        if self.heartbeat_seconds > 0 and self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
 
-    async def connect(self, thread_key: str, websocket: WebSocket) -> None:
-        await websocket.accept()
-        self._connections[thread_key].add(websocket)
+    async def stop(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        await self.backplane.stop()
+
+    @property
+    def connection_count(self) -> int:
+        return self._connection_count
+
+    @property
+    def thread_count(self) -> int:
+        return len(self._connections)
+
+    def queued_bytes(self) -> int:
+        return sum(
+            len(text.encode("utf-8"))
+            for subscribers in self._connections.values()
+            for subscriber in subscribers.values()
+            for text, _ in subscriber.queue._queue
+        )
+
+    async def connect(
+        self,
+        thread_key: str,
+        websocket: WebSocket,
+        paused: bool = False,
+        client_ip: str = "unknown",
+        compact: bool = False,
+    ) -> bool:
+        if (
+            self._connection_count >= self.max_connections
+            or self._connections_per_ip.get(client_ip, 0) >= self.max_connections_per_ip
+        ):
+            return False
+        self._connection_count += 1
+        self._connections_per_ip[client_ip] += 1
+        try:
+            await websocket.accept()
+        except Exception:
+            self._release(client_ip)
+            raise
+        subscriber = _Subscriber(websocket, self.max_queue, client_ip, compact)
+        if not paused:
+            subscriber.task = asyncio.create_task(self._writer(thread_key, subscriber, []))
+        self._connections[thread_key][websocket] = subscriber
+        return True
+
+    def resume(self, thread_key: str, websocket: WebSocket, preamble: list[str]) -> None:
+        subscriber = self._connections.get(thread_key, {}).get(websocket)
+        if subscriber is not None and subscriber.task is None:
+            subscriber.task = asyncio.create_task(self._writer(thread_key, subscriber, preamble))
 
     def disconnect(self, thread_key: str, websocket: WebSocket) -> None:
-        if thread_key not in self._connections:
+        subscribers = self._connections.get(thread_key)
+        if subscribers is None:
             return
-        self._connections[thread_key].discard(websocket)
-        if not self._connections[thread_key]:
+        subscriber = subscribers.pop(websocket, None)
+        if not subscribers:
             del self._connections[thread_key]
+        if subscriber is None:
+            return
+        self._release(subscriber.client_ip)
+        if subscriber.task is not None and subscriber.task is not asyncio.current_task():
+            subscriber.task.cancel()
+
+    def evict(self, thread_key: str, websocket: WebSocket, code: int) -> None:
+        self.disconnect(thread_key, websocket)
+        task = asyncio.create_task(self._close(websocket, code))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def subscriber_count(self, thread_key: str) -> int:
+        subscribers = self._connections.get(thread_key)
+        return len(subscribers) if subscribers else 0
+
+    async def broadcast_frame(
+        self,
+        thread_key: str,
+        frame: str,
+        message_id: int | None = None,
+        session: AsyncSession | None = None,
+    ) -> None:
+        if not metrics.enabled:
+            await self.backplane.publish(thread_key, frame, message_id, session)
+            return
+        start = time.perf_counter()
+        await self.backplane.publish(thread_key, frame, message_id, session)
+        ws_broadcast_seconds.observe(time.perf_counter() - start)
+
+    def _deliver(self, thread_key: str, frame: str, message_id: int | None) -> None:
+        if self.on_message is not None and message_id is not None:
+            self.on_message(thread_key, message_id, frame[len(MESSAGE_FRAME_PREFIX) : -1])
+        subscribers = self._connections.get(thread_key)
+        if not subscribers:
+            return
+        item = (frame, False)
+        compact_item = None
+        for subscriber in list(subscribers.values()):
+            if subscriber.compact:
+                if compact_item is None:
+                    compact_item = _compact_item(frame)
+                self._enqueue(thread_key, subscriber, compact_item)
+            else:
+                self._enqueue(thread_key, subscriber, item)
+
+    def _enqueue(self, thread_key: str, subscriber: _Subscriber, item: _QueueItem) -> None:
+        try:
+            subscriber.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.evict(thread_key, subscriber.websocket, SLOW_CONSUMER_CLOSE_CODE)
+
+    def _release(self, client_ip: str) -> None:
+        self._connection_count -= 1
+        remaining = self._connections_per_ip.get(client_ip, 0) - 1
+        if remaining > 0:
+            self._connections_per_ip[client_ip] = remaining
+        else:
+            self._connections_per_ip.pop(client_ip, None)
+
+    async def _heartbeat(self) -> None:
+        ping = (PING_FRAME, False)
+        compact_ping = (COMPACT_PING_FRAME, False)
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for thread_key, subscribers in list(self._connections.items()):
+                for subscriber in list(subscribers.values()):
+                    self._enqueue(thread_key, subscriber, compact_ping if subscriber.compact else ping)
+
+    async def _writer(self, thread_key: str, subscriber: _Subscriber, preamble: list[str]) -> None:
+        try:
+            for text in preamble:
+                await subscriber.websocket.send_text(text)
+            while True:
+                text, batchable = await subscriber.queue.get()
+                if not batchable:
+                    await subscriber.websocket.send_text(text)
+                    continue
+                bodies = [text]
+                pending = None
+                while len(bodies) < self.max_batch and not subscriber.queue.empty():
+                    text, batchable = subscriber.queue.get_nowait()
+                    if not batchable:
+                        pending = text
+                        break
+                    bodies.append(text)
+                await subscriber.websocket.send_text(encode_compact_frame("m", "[" + ",".join(bodies) + "]"))
+                if pending is not None:
+                    await subscriber.websocket.send_text(pending)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(thread_key, subscriber.websocket)
 
-    async def broadcast(self, thread_key: str, payload: dict) -> None:
-        recipients = list(self._connections.get(thread_key, set()))
-        for ws in recipients:
-            await ws.send_json(payload)
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int) -> None:
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
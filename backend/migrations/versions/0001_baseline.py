@@ -0,0 +1,70 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("email", sa.String(320), nullable=False),
+        sa.Column("display_name", sa.String(64), nullable=False),
+        sa.Column("google_sub", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("last_login_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_google_sub", "users", ["google_sub"], unique=True)
+
+    op.create_table(
+        "magic_link_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("token_hash", sa.String(64), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("used", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_magic_link_tokens_user_id", "magic_link_tokens", ["user_id"])
+    op.create_index("ix_magic_link_tokens_token_hash", "magic_link_tokens", ["token_hash"], unique=True)
+    op.create_index("ix_magic_link_tokens_expires_at", "magic_link_tokens", ["expires_at"])
+    op.create_index("ix_magic_link_tokens_used", "magic_link_tokens", ["used"])
+
+    op.create_table(
+        "threads",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("thread_key", sa.String(1024), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_threads_thread_key", "threads", ["thread_key"], unique=True)
+
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("thread_id", sa.Integer(), sa.ForeignKey("threads.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("client_id", sa.String(128), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_messages_thread_id", "messages", ["thread_id"])
+    op.create_index("ix_messages_client_id", "messages", ["client_id"])
+    op.create_index("ix_messages_created_at", "messages", ["created_at"])
+    op.create_index("ix_messages_thread_created", "messages", ["thread_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("messages")
+    op.drop_table("threads")
+    op.drop_table("magic_link_tokens")
+    op.drop_table("users")
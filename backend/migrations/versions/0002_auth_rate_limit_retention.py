@@ -0,0 +1,43 @@
+"""token versions, shared rate limit counters and message archive
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("token_version", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("threads", sa.Column("retention_days", sa.Integer(), nullable=True))
+
+    op.create_table(
+        "rate_limit_counters",
+        sa.Column("key", sa.String(128), primary_key=True),
+        sa.Column("window_start", sa.BigInteger(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "messages_archive",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=False),
+        sa.Column("thread_id", sa.Integer(), sa.ForeignKey("threads.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("client_id", sa.String(128), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("messages_archive")
+    op.drop_table("rate_limit_counters")
+    with op.batch_alter_table("threads") as batch:
+        batch.drop_column("retention_days")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("token_version")
@@ -0,0 +1,31 @@
+"""drop unused indexes and cover the message page query
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_messages_thread_created_id", "messages", ["thread_id", "created_at", "id"])
+    op.drop_index("ix_messages_thread_created", table_name="messages")
+    op.drop_index("ix_messages_thread_id", table_name="messages")
+    op.drop_index("ix_messages_client_id", table_name="messages")
+    op.drop_index("ix_messages_created_at", table_name="messages")
+    op.drop_index("ix_magic_link_tokens_used", table_name="magic_link_tokens")
+
+
+def downgrade() -> None:
+    op.create_index("ix_magic_link_tokens_used", "magic_link_tokens", ["used"])
+    op.create_index("ix_messages_created_at", "messages", ["created_at"])
+    op.create_index("ix_messages_client_id", "messages", ["client_id"])
+    op.create_index("ix_messages_thread_id", "messages", ["thread_id"])
+    op.create_index("ix_messages_thread_created", "messages", ["thread_id", "created_at"])
+    op.drop_index("ix_messages_thread_created_id", table_name="messages")
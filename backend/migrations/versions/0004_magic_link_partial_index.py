@@ -0,0 +1,33 @@
+"""index only unused magic link tokens
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_magic_link_tokens_unused_hash",
+        "magic_link_tokens",
+        ["token_hash"],
+        unique=True,
+        postgresql_where=sa.text("NOT used"),
+        sqlite_where=sa.text("used = 0"),
+    )
+    op.drop_index("ix_magic_link_tokens_token_hash", table_name="magic_link_tokens")
+    op.drop_index("ix_magic_link_tokens_expires_at", table_name="magic_link_tokens")
+
+
+def downgrade() -> None:
+    op.create_index("ix_magic_link_tokens_expires_at", "magic_link_tokens", ["expires_at"])
+    op.create_index("ix_magic_link_tokens_token_hash", "magic_link_tokens", ["token_hash"], unique=True)
+    op.drop_index("ix_magic_link_tokens_unused_hash", table_name="magic_link_tokens")
@@ -0,0 +1,23 @@
+"""key message pages on (thread_id, id)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_messages_thread_id_id", "messages", ["thread_id", "id"])
+    op.drop_index("ix_messages_thread_created_id", table_name="messages")
+
+
+def downgrade() -> None:
+    op.create_index("ix_messages_thread_created_id", "messages", ["thread_id", "created_at", "id"])
+    op.drop_index("ix_messages_thread_id_id", table_name="messages")
@@ -0,0 +1,21 @@
+"""block-range index on messages.created_at for archival
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_messages_created_at_brin", "messages", ["created_at"], postgresql_using="brin")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_created_at_brin", table_name="messages")
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""Load-test the REST and WebSocket paths and write machine-readable results.
+
+Run from backend/ (needs requirements-bench.txt for the default SQLite run):
+    python scripts/bench_app.py [--database-url URL] [--base-url URL]
+        [--posts 2000] [--post-concurrency 32] [--gets 2000] [--get-concurrency 8]
+        [--subscribers 10,100,1000,10000] [--fanout-messages 5] [--output bench_results.json]
+
+Without --base-url the app is served in-process by uvicorn on a loopback
+ephemeral port, against a fresh SQLite database unless --database-url is
+given; migrations are applied and rate/connection limits are lifted for the
+run. With --base-url an already running server is driven instead; it must
+share --database-url and AUTH_SECRET with this process (a bench user is
+created directly in the database) and should be started with
+POST_RATE_LIMIT_MAX_EVENTS, WS_MAX_CONNECTIONS and WS_MAX_CONNECTIONS_PER_IP
+raised above the run's load and WS_IDLE_TIMEOUT_SECONDS=0.
+
+Fan-out latency is measured from just before the POST is sent until each
+subscriber socket receives the frame, so it includes the insert and the
+client-side receive loop of this process. Subscriber counts that would not
+fit under the open-file limit are reported as skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import UTC, datetime
+from pathlib import Path
+from urllib.parse import quote
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+CONNECT_CHUNK = 500
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_ms(values: list[float]) -> dict[str, float]:
+    return {
+        "p50_ms": round(percentile(values, 50), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(max(values, default=0.0), 3),
+        "mean_ms": round(statistics.fmean(values), 3) if values else 0.0,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def raise_fd_limit() -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        soft = hard
+    return soft
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    if args.database_url is None:
+        args.database_url = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='urlchatroom-bench-')}/bench.db"
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.base_url is None:
+        os.environ.setdefault("POST_RATE_LIMIT_MAX_EVENTS", "1000000000")
+        os.environ.setdefault("WS_MAX_CONNECTIONS", "1000000")
+        os.environ.setdefault("WS_MAX_CONNECTIONS_PER_IP", "1000000")
+        os.environ.setdefault("WS_SEND_QUEUE_SIZE", str(max(64, args.fanout_messages * 4)))
+        os.environ.setdefault("WS_HEARTBEAT_SECONDS", "0")
+        os.environ.setdefault("WS_IDLE_TIMEOUT_SECONDS", "0")
+
+
+def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    command.upgrade(config, "head")
+
+
+async def create_bench_token() -> str:
+    from sqlalchemy import select
+
+    from app.db import SessionLocal
+    from app.models import User
+    from app.services.auth import create_access_token
+
+    email = "bench@example.com"
+    async with SessionLocal() as db:
+        user = (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
+        if user is None:
+            user = User(email=email, display_name="bench")
+            db.add(user)
+            await db.commit()
+            await db.refresh(user)
+        token, _ = create_access_token(
+            user_id=user.id,
+            email=user.email,
+            display_name=user.display_name,
+            token_version=user.token_version,
+        )
+    return token
+
+
+async def start_server() -> tuple[object, asyncio.Task, str]:
+    import uvicorn
+
+    from app.main import app
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    config = uvicorn.Config(app, log_level="warning", backlog=4096, ws_ping_interval=None, lifespan="on")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+async def run_pool(count: int, concurrency: int, operation) -> list[float]:
+    latencies: list[float] = []
+    next_index = iter(range(count))
+
+    async def worker() -> None:
+        for index in next_index:
+            start = time.perf_counter()
+            await operation(index)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def bench_posts(client, headers: dict[str, str], thread_key: str, count: int, concurrency: int) -> dict:
+    async def post(index: int) -> None:
+        resp = await client.post(
+            "/api/messages",
+            json={"thread_key": thread_key, "client_id": "bench", "content": f"bench message {index}"},
+            headers=headers,
+        )
+        resp.raise_for_status()
+
+    start = time.perf_counter()
+    latencies = await run_pool(count, concurrency, post)
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": count,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(count / elapsed, 1),
+        **summarize_ms(latencies),
+    }
+
+
+async def bench_gets(client, thread_key: str, count: int, concurrency: int, limit: int) -> dict:
+    async def get(_: int) -> None:
+        resp = await client.get("/api/messages", params={"thread_key": thread_key, "limit": limit})
+        resp.raise_for_status()
+
+    start = time.perf_counter()
+    latencies = await run_pool(count, concurrency, get)
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": count,
+        "concurrency": concurrency,
+        "limit": limit,
+        "requests_per_s": round(count / elapsed, 1),
+        **summarize_ms(latencies),
+    }
+
+
+async def next_message(ws) -> None:
+    while not (await ws.recv()).startswith('{"type":"message"'):
+        pass
+
+
+async def open_subscribers(ws_url: str, count: int) -> list:
+    from websockets.asyncio.client import connect
+
+    async def open_one():
+        ws = await connect(ws_url, compression=None, max_queue=None, open_timeout=60, ping_interval=None)
+        await ws.recv()
+        return ws
+
+    sockets = []
+    for offset in range(0, count, CONNECT_CHUNK):
+        sockets.extend(await asyncio.gather(*(open_one() for _ in range(min(CONNECT_CHUNK, count - offset)))))
+    return sockets
+
+
+async def bench_fanout(client, headers: dict[str, str], base_url: str, subscribers: int, messages: int) -> dict:
+    thread_key = f"url:https://bench.example.com/fanout/{subscribers}/{uuid.uuid4().hex[:8]}"
+    ws_url = base_url.replace("http", "ws", 1) + "/ws/" + quote(thread_key, safe="")
+
+    connect_start = time.perf_counter()
+    sockets = await open_subscribers(ws_url, subscribers)
+    connect_s = time.perf_counter() - connect_start
+
+    delivery_ms: list[float] = []
+    slowest_ms: list[float] = []
+    try:
+        for index in range(messages):
+            receivers = [asyncio.create_task(next_message(ws)) for ws in sockets]
+            arrivals: list[float] = []
+            for receiver in receivers:
+                receiver.add_done_callback(lambda _: arrivals.append(time.perf_counter()))
+            start = time.perf_counter()
+            resp = await client.post(
+                "/api/messages",
+                json={"thread_key": thread_key, "client_id": "bench", "content": f"fanout {index}"},
+                headers=headers,
+            )
+            resp.raise_for_status()
+            await asyncio.wait_for(asyncio.gather(*receivers), timeout=120)
+            latencies = [(arrival - start) * 1000 for arrival in arrivals]
+            delivery_ms.extend(latencies)
+            slowest_ms.append(max(latencies))
+    finally:
+        for offset in range(0, len(sockets), CONNECT_CHUNK):
+            await asyncio.gather(*(ws.close() for ws in sockets[offset : offset + CONNECT_CHUNK]))
+
+    return {
+        "subscribers": subscribers,
+        "messages": messages,
+        "connect_s": round(connect_s, 3),
+        "delivery": summarize_ms(delivery_ms),
+        "last_subscriber_p50_ms": round(percentile(slowest_ms, 50), 3),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+
+    fd_limit = raise_fd_limit()
+    server = task = None
+    base_url = args.base_url
+    if base_url is None:
+        server, task, base_url = await start_server()
+    fds_per_subscriber = 2 if args.base_url is None else 1
+
+    try:
+        token = await create_bench_token()
+        headers = {"Authorization": f"Bearer {token}"}
+        limits = httpx.Limits(max_connections=args.post_concurrency + args.get_concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            thread_key = f"url:https://bench.example.com/rest/{uuid.uuid4().hex[:8]}"
+            results: dict = {
+                "post_messages": await bench_posts(client, headers, thread_key, args.posts, args.post_concurrency),
+                "get_messages": await bench_gets(client, thread_key, args.gets, args.get_concurrency, args.limit),
+                "ws_fanout": [],
+            }
+            for count in (int(value) for value in args.subscribers.split(",") if value):
+                if count * fds_per_subscriber + 256 > fd_limit:
+                    results["ws_fanout"].append({"subscribers": count, "skipped": f"open-file limit {fd_limit}"})
+                    continue
+                results["ws_fanout"].append(
+                    await bench_fanout(client, headers, base_url, count, args.fanout_messages)
+                )
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await task
+
+    return results
+
+
+def print_summary(report: dict) -> None:
+    post = report["results"]["post_messages"]
+    get = report["results"]["get_messages"]
+    print(f"POST /api/messages  {post['requests_per_s']:>9.1f} req/s  p50 {post['p50_ms']:.2f} ms  p99 {post['p99_ms']:.2f} ms")
+    print(f"GET  /api/messages  {get['requests_per_s']:>9.1f} req/s  p50 {get['p50_ms']:.2f} ms  p99 {get['p99_ms']:.2f} ms")
+    for row in report["results"]["ws_fanout"]:
+        if "skipped" in row:
+            print(f"WS fan-out {row['subscribers']:>6}  skipped ({row['skipped']})")
+            continue
+        delivery = row["delivery"]
+        print(
+            f"WS fan-out {row['subscribers']:>6}  p50 {delivery['p50_ms']:.2f} ms  p99 {delivery['p99_ms']:.2f} ms"
+            f"  last subscriber p50 {row['last_subscriber_p50_ms']:.2f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--base-url")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--post-concurrency", type=int, default=32)
+    parser.add_argument("--gets", type=int, default=2000)
+    parser.add_argument("--get-concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--subscribers", default="10,100,1000,10000")
+    parser.add_argument("--fanout-messages", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    if args.base_url is None:
+        migrate()
+
+    results = asyncio.run(run(args))
+    from app.config import settings
+
+    report = {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": args.database_url.split(":", 1)[0],
+        "mode": "loopback" if args.base_url else "in-process",
+        "settings": {
+            "message_batch_enabled": settings.message_batch_enabled,
+            "auth_stateless": settings.auth_stateless,
+            "rate_limit_backend": settings.rate_limit_backend,
+            "ws_backplane": settings.ws_backplane,
+        },
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    print_summary(report)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Compare access token verify throughput before and after key/token caching.
+
+Run from backend/:
+    python scripts/bench_auth.py [--rounds 5] [--number 20000]
+
+"reference" re-derives the HMAC key and re-parses the payload on every
+call, as decode_access_token originally did. "current (cold)" clears the
+verified-token cache before each call so only the prepared HMAC key helps;
+"current (warm)" is the repeated-bearer-token case the cache targets.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import statistics
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+from app.services import auth  # noqa: E402
+
+
+def reference_decode(raw_token: str) -> dict:
+    encoded, signature = raw_token.split(".", 1)
+    expected_sig = hmac.new(
+        settings.auth_secret.encode("utf-8"),
+        encoded.encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+    if not hmac.compare_digest(signature, expected_sig):
+        raise ValueError("invalid token signature")
+    payload = json.loads(auth._unb64url(encoded).decode("utf-8"))
+    if payload["exp"] < int(auth.now_utc().timestamp()):
+        raise ValueError("token expired")
+    return payload
+
+
+def current_cold(raw_token: str) -> dict:
+    auth._verified_tokens.clear()
+    return auth.decode_access_token(raw_token)
+
+
+def bench(label: str, fn, token: str, rounds: int, number: int) -> None:
+    timings = timeit.repeat(lambda: fn(token), repeat=rounds, number=number)
+    per_call_us = [t / number * 1e6 for t in timings]
+    best = min(per_call_us)
+    print(
+        f"{label:<16} best {best:7.3f} us/verify  median {statistics.median(per_call_us):7.3f} us/verify"
+        f"  ({1e6 / best:,.0f} verifies/s)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    token, _ = auth.create_access_token(
+        user_id=42,
+        email="someone@example.com",
+        display_name="someone with a fairly long display name",
+    )
+    assert reference_decode(token) == auth.decode_access_token(token)
+
+    bench("reference", reference_decode, token, args.rounds, args.number)
+    bench("current (cold)", current_cold, token, args.rounds, args.number)
+    auth.decode_access_token(token)
+    bench("current (warm)", auth.decode_access_token, token, args.rounds, args.number)
+
+
+if __name__ == "__main__":
+    main()
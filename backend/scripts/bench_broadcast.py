@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Measure serialization cost per broadcast as a function of subscriber count.
+
+Run from backend/:
+    python scripts/bench_broadcast.py [--subscribers 1,10,100,1000,2000,10000] [--rounds 20]
+
+"per-recipient" models the original path: model_dump(mode="json") once,
+then json.dumps inside every ws.send_json. "encode-once" is the current
+path: the message is encoded once and the same frame is handed to every
+subscriber queue. Sockets are in-memory stubs, so only encoding and
+enqueue work is timed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.schemas import MessageRead  # noqa: E402
+from app.services.message_cache import encode_message  # noqa: E402
+from app.services.ws_hub import WebSocketHub, encode_frame  # noqa: E402
+
+THREAD_KEY = "url:https://example.com/articles/2024/some-long-article-slug?id=12345&page=2"
+
+
+class StubWebSocket:
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        pass
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+def sample_message() -> MessageRead:
+    return MessageRead(
+        id=123456,
+        thread_key=THREAD_KEY,
+        client_id="someone",
+        content="hello there, this is a fairly ordinary chat message with some text in it " * 4,
+        created_at=datetime.now(UTC),
+    )
+
+
+def per_recipient(message: MessageRead, subscribers: int) -> None:
+    payload = {"type": "message", "data": message.model_dump(mode="json")}
+    for _ in range(subscribers):
+        json.dumps(payload)
+
+
+async def encode_once(hub: WebSocketHub, message: MessageRead) -> None:
+    encoded = encode_message(message)
+    await hub.broadcast_frame(THREAD_KEY, encode_frame("message", encoded[1]))
+
+
+async def bench_count(subscribers: int, rounds: int) -> tuple[float, float]:
+    hub = WebSocketHub(max_queue=rounds + 1, max_connections=subscribers, max_connections_per_ip=subscribers)
+    for _ in range(subscribers):
+        await hub.connect(THREAD_KEY, StubWebSocket(), paused=True)
+    message = sample_message()
+
+    old_us = []
+    new_us = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        per_recipient(message, subscribers)
+        old_us.append((time.perf_counter() - start) * 1e6)
+
+        start = time.perf_counter()
+        await encode_once(hub, message)
+        new_us.append((time.perf_counter() - start) * 1e6)
+
+    for websocket in list(hub._connections.get(THREAD_KEY, {})):
+        hub.disconnect(THREAD_KEY, websocket)
+    return statistics.median(old_us), statistics.median(new_us)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", default="1,10,100,1000,2000,10000")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'subscribers':>11}  {'per-recipient us':>16}  {'encode-once us':>14}  {'speedup':>7}")
+    for count in (int(value) for value in args.subscribers.split(",")):
+        old, new = await bench_count(count, args.rounds)
+        print(f"{count:>11}  {old:>16.1f}  {new:>14.1f}  {old / new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.google_auth import GoogleTokenVerifier
+
+pytestmark = pytest.mark.anyio
+
+ACCESS_TOKEN = "ya29.stub-access-token-0123456789"
+
+
+class _StubGoogle:
+    def __init__(self) -> None:
+        self.userinfo = {"sub": "1234", "email": "alice@example.com", "email_verified": True, "name": "Alice"}
+        self.tokeninfo = {"aud": "client-id", "expires_in": "3599"}
+        self.status = 200
+        self.delay = 0.0
+        self.hits: Counter[str] = Counter()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        stub: _StubGoogle = self.server.stub
+        endpoint = urlparse(self.path).path.strip("/")
+        stub.hits[endpoint] += 1
+        time.sleep(stub.delay)
+        body = json.dumps(getattr(stub, endpoint)).encode("utf-8")
+        self.send_response(stub.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+def google(monkeypatch: pytest.MonkeyPatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.stub = _StubGoogle()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(settings, "google_userinfo_url", f"{base_url}/userinfo")
+    monkeypatch.setattr(settings, "google_tokeninfo_url", f"{base_url}/tokeninfo")
+    monkeypatch.setattr(settings, "google_client_id", "")
+    yield server.stub
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+async def verifier():
+    verifier = GoogleTokenVerifier(cache_ttl_seconds=300)
+    yield verifier
+    await verifier.stop()
+
+
+async def test_cache_hit_skips_upstream(google: _StubGoogle, verifier: GoogleTokenVerifier) -> None:
+    first = await verifier.verify(ACCESS_TOKEN)
+    second = await verifier.verify(ACCESS_TOKEN)
+
+    assert first == second == google.userinfo
+    assert google.hits == {"userinfo": 1, "tokeninfo": 1}
+
+
+async def test_cache_entry_expires_with_token(google: _StubGoogle, verifier: GoogleTokenVerifier) -> None:
+    google.tokeninfo["expires_in"] = "1"
+
+    await verifier.verify(ACCESS_TOKEN)
+    await asyncio.sleep(1.1)
+    await verifier.verify(ACCESS_TOKEN)
+
+    assert google.hits["userinfo"] == 2
+
+
+async def test_concurrent_verifications_share_one_upstream_call(
+    google: _StubGoogle, verifier: GoogleTokenVerifier
+) -> None:
+    google.delay = 0.2
+
+    results = await asyncio.gather(*(verifier.verify(ACCESS_TOKEN) for _ in range(10)))
+
+    assert all(result == google.userinfo for result in results)
+    assert google.hits == {"userinfo": 1, "tokeninfo": 1}
+
+
+async def test_upstream_failure_is_not_cached(google: _StubGoogle, verifier: GoogleTokenVerifier) -> None:
+    google.status = 401
+    with pytest.raises(HTTPException) as exc_info:
+        await verifier.verify(ACCESS_TOKEN)
+    assert exc_info.value.status_code == 401
+
+    google.status = 200
+    assert await verifier.verify(ACCESS_TOKEN) == google.userinfo
+    assert google.hits["userinfo"] == 2
+
+
+async def test_rejected_token_is_not_cached(google: _StubGoogle, verifier: GoogleTokenVerifier) -> None:
+    google.userinfo["email_verified"] = False
+    with pytest.raises(HTTPException):
+        await verifier.verify(ACCESS_TOKEN)
+
+    google.userinfo["email_verified"] = True
+    assert await verifier.verify(ACCESS_TOKEN) == google.userinfo
+    assert google.hits["userinfo"] == 2
+
+
+async def test_audience_mismatch_rejected(
+    google: _StubGoogle, verifier: GoogleTokenVerifier, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "google_client_id", "another-client")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await verifier.verify(ACCESS_TOKEN)
+    assert exc_info.value.detail == "google token audience mismatch"
@@ -0,0 +1,42 @@
+from app.services.message_cache import RecentMessageCache
+
+
+def _message(message_id: int) -> tuple[int, bytes]:
+    return message_id, f'{{"id":{message_id}}}'.encode("utf-8")
+
+
+def _cache(max_threads: int = 4) -> RecentMessageCache:
+    return RecentMessageCache(max_threads=max_threads, tail_size=10, ttl_seconds=0, max_bytes=1 << 20)
+
+
+def test_appends_to_cold_threads_do_not_evict_filled_tails() -> None:
+    cache = _cache()
+    cache.fill("hot", [_message(1), _message(2)], complete=True)
+
+    for index in range(1024):
+        cache.append(f"cold-{index}", _message(index + 3))
+
+    assert len(cache) == 1
+    assert cache.latest("hot", 2) == [_message(1), _message(2)]
+
+
+def test_appends_during_fill_are_merged() -> None:
+    cache = _cache()
+
+    with cache.filling("thread"):
+        cache.append("thread", _message(3))
+        cache.fill("thread", [_message(1), _message(2)], complete=True)
+
+    assert cache.latest("thread", 10) == [_message(1), _message(2), _message(3)]
+    cache.append("other", _message(4))
+    assert cache.latest("other", 1) is None
+
+
+def test_fill_keeps_newer_appends() -> None:
+    cache = _cache()
+    cache.fill("thread", [_message(1)], complete=True)
+    cache.append("thread", _message(3))
+
+    cache.fill("thread", [_message(1), _message(2)], complete=True)
+
+    assert cache.latest("thread", 10) == [_message(1), _message(2), _message(3)]
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db import Base
+from app.models import RateLimitCounter
+from app.services.rate_limiter import DatabaseRateLimiter
+
+pytestmark = pytest.mark.anyio
+
+MAX_EVENTS = 10
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'limits.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[RateLimitCounter.__table__])
+    yield async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _hit(limiter: DatabaseRateLimiter, session_factory: async_sessionmaker[AsyncSession]) -> bool:
+    async with session_factory() as session:
+        return await limiter.hit("1:127.0.0.1", session)
+
+
+async def test_concurrent_posts_stop_at_limit(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    limiter = DatabaseRateLimiter(max_events=MAX_EVENTS, window_seconds=60, local_budget=3)
+
+    results = await asyncio.gather(*(_hit(limiter, session_factory) for _ in range(2 * MAX_EVENTS)))
+
+    assert results.count(True) == MAX_EVENTS
+
+
+async def test_workers_share_the_limit(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    workers = [
+        DatabaseRateLimiter(max_events=MAX_EVENTS, window_seconds=60, local_budget=3, workers=2) for _ in range(2)
+    ]
+
+    results = [await _hit(workers[index % 2], session_factory) for index in range(2 * MAX_EVENTS)]
+
+    assert results.count(True) == MAX_EVENTS
+
+
+def test_local_budget_is_split_across_workers() -> None:
+    limiter = DatabaseRateLimiter(max_events=15, window_seconds=60, local_budget=3, workers=8)
+
+    assert limiter.local_budget == 1
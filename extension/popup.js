@@ -123,6 +123,8 @@ let currentUser = null;
 let lastGoogleAccessToken = "";
 let reconnectTimer = null;
 let reconnectAttempts = 0;
+let lastMessageId = 0;
+const seenMessageIds = new Set();
 let isSending = false;
 let settingsOpen = false;
 let appSettings = { ...DEFAULT_SETTINGS };
@@ -239,6 +241,12 @@ function maybeNotifyIncomingMessage(msg) {
 }
 
 function renderMessage(msg) {
+  if (seenMessageIds.has(msg.id)) {
+    return;
+  }
+  seenMessageIds.add(msg.id);
+  lastMessageId = Math.max(lastMessageId, msg.id);
+
   const item = document.createElement("article");
   const isCurrentUser = currentUser && msg.client_id === currentUser.display_name;
   const isMention = !isCurrentUser && containsMention(msg.content || "");
@@ -257,10 +265,6 @@ function renderMessage(msg) {
   messagesEl.scrollTop = messagesEl.scrollHeight;
 }
 
-function clearMessages() {
-  messagesEl.innerHTML = "";
-}
-
 function applyUser(user) {
   currentUser = user;
   if (!user) {
@@ -392,17 +396,6 @@ async function signInWithGoogle() {
   setStatus(t("signed_in_ok"));
 }
 
-async function loadMessages() {
-  const encoded = encodeURIComponent(threadKey);
-  const response = await fetch(`${API_BASE}/api/messages?thread_key=${encoded}&limit=100`);
-  if (!response.ok) {
-    throw new Error("Failed to load messages");
-  }
-  const data = await response.json();
-  clearMessages();
-  data.forEach(renderMessage);
-}
-
 function scheduleReconnect() {
   if (reconnectTimer) {
     return;
@@ -415,6 +408,20 @@ function scheduleReconnect() {
   }, Math.min(3000 + reconnectAttempts * 1000, 10000));
 }
 
+function clearMessages() {
+  seenMessageIds.clear();
+  messagesEl.replaceChildren();
+}
+
+function expandMessage(compact) {
+  return {
+    id: compact.i,
+    client_id: compact.c,
+    content: compact.m,
+    created_at: new Date(compact.s).toISOString(),
+  };
+}
+
 function connectWebSocket() {
   if (!threadKey) {
     return;
@@ -425,7 +432,9 @@ function connectWebSocket() {
   }
 
   const wsThread = encodeURIComponent(threadKey);
-  ws = new WebSocket(`${WS_BASE}/ws/${wsThread}?client_id=${encodeURIComponent(clientId)}`);
+  ws = new WebSocket(
+    `${WS_BASE}/ws/${wsThread}?client_id=${encodeURIComponent(clientId)}&last_id=${lastMessageId}&v=2`
+  );
 
   ws.onopen = () => {
     reconnectAttempts = 0;
@@ -434,9 +443,18 @@ function connectWebSocket() {
 
   ws.onmessage = (event) => {
     const payload = JSON.parse(event.data);
-    if (payload.type === "message") {
-      maybeNotifyIncomingMessage(payload.data);
-      renderMessage(payload.data);
+    if (payload.t === "ping") {
+      ws.send("pong");
+    } else if (payload.t === "history") {
+      if (payload.g) {
+        clearMessages();
+      }
+      payload.d.map(expandMessage).forEach(renderMessage);
+    } else if (payload.t === "m") {
+      payload.d.map(expandMessage).forEach((msg) => {
+        maybeNotifyIncomingMessage(msg);
+        renderMessage(msg);
+      });
     }
   };
 
@@ -622,7 +640,6 @@ input.addEventListener("keydown", (event) => {
     renderView();
     updateOnlineBadge(user ? 1 : 0);
 
-    await loadMessages();
     connectWebSocket();
 
     if (user) {